@@ -1,5 +1,6 @@
 import random
 import math
+import time
 import numpy as np
 import threading
 import queue
@@ -8,23 +9,57 @@ import multiprocessing as mp
 import dubins
 from GA_SEAD_process import *
 from communication_info import *
+from cost_cache import CostGraphCache
+from island import IslandModel
+from fitness_pool import FitnessPool
+from convergence import ConvergenceMonitor
+from dubins_table import DubinsLengthTable
 
 
-def task_allocation_process(targets_sites, time_interval, pop_size, ga2control_queue, control2ga_queue):
+def task_allocation_process(targets_sites, time_interval, pop_size, ga2control_queue, control2ga_queue,
+                            graph_cache_dir=None, island_num=0, fitness_workers=0, fitness_min_batch=None,
+                            auction_seed=False, dubins_table=False):
     ga_population, update = None, True
     sead_mission = GA_SEAD(targets_sites, pop_size)
+    sead_mission.auction_seed = auction_seed
+    if dubins_table:  # cost graphs by lookups in the normalized Dubins length table
+        sead_mission.dubins_table = DubinsLengthTable.load()
+    if graph_cache_dir:  # e.g. ~/.cache/GA_SEAD, the cost graphs of earlier sorties are reused from the disk
+        sead_mission.graph_cache = CostGraphCache(graph_cache_dir)
+    if island_num > 1:
+        sead_mission.islands = IslandModel(island_num)
+    elif fitness_workers > 1:
+        sead_mission.fitness_pool = FitnessPool(fitness_workers, fitness_min_batch)
+    convergence = ConvergenceMonitor()
     uavs = control2ga_queue.get()
-    while True:
+    while uavs != [44]:
+        if update and sead_mission.mission_changes(uavs):
+            convergence.reset()  # a new problem, the history of the old one says nothing about it
         solution, fitness_value, ga_population = sead_mission.run_GA_time_period_version(time_interval, uavs,
                                                                                          ga_population, update)
-        ga2control_queue.put([fitness_value, solution])  # put the best solution to task execution thread
-        if not control2ga_queue.empty():
-            uavs = control2ga_queue.get()  # get other uav information from task execution thread
-            update = True
-            if uavs == [44]:
+        # put the best solution and the GA profile to task execution thread
+        ga2control_queue.put([fitness_value, solution, sead_mission.stats.as_dict()])
+        if not len(solution) or not len(solution[0]):
+            # nothing to plan (all tasks done or no solution), wait for new information
+            uavs, update = control2ga_queue.get(), True
+            continue
+        # back off while the search has converged, the CPU goes to the control loop: routine position updates are
+        # taken along without waking the GA, a change of the problem is planned at once
+        idle = convergence.update(fitness_value, sead_mission.population_diversity(ga_population, solution)
+                                  if ga_population is not None else 0, sead_mission.stats.generations)
+        wake_time, update = time.time() + idle, False
+        while True:
+            try:
+                message = control2ga_queue.get(timeout=max(0, wake_time - time.time())) if idle else \
+                    control2ga_queue.get_nowait()
+            except queue.Empty:
                 break
-        else:
-            update = False
+            uavs, update = message, True  # get other uav information from task execution thread
+            if uavs == [44] or sead_mission.mission_changes(uavs):
+                break
+    for pool in [sead_mission.islands, sead_mission.fitness_pool]:
+        if pool:
+            pool.close()
 
 
 class UAV_Simulator(object):
@@ -87,6 +122,7 @@ class main_process(object):
         self.packet, self.pos = [], []
         self.target = None
         self.fitness, self.best_solution = 1e-5, []
+        self.ga_stats = None  # GAStats.as_dict of the last task allocation
         self.terminated_tasks, self.new_targets = [], []
         self.previous_time_u2u, self.previous_time_control = 0, 0
         # path following setting
@@ -129,7 +165,7 @@ class main_process(object):
         # communication layer
         while not self.ga2control_queue.empty():
             # task allocation thread to main thread
-            self.fitness, self.best_solution = self.ga2control_queue.get()
+            self.fitness, self.best_solution, self.ga_stats = self.ga2control_queue.get()
 
         if new_timer.check_timer(self.T, self.previous_time_u2u, -0.1) and not self.back_to_base:
             self.previous_time_u2u = time.time()
@@ -213,7 +249,7 @@ class main_process(object):
         # communication layer
         while not self.ga2control_queue.empty():
             # task allocation thread to main thread
-            self.fitness, self.best_solution = self.ga2control_queue.get()
+            self.fitness, self.best_solution, self.ga_stats = self.ga2control_queue.get()
 
         if new_timer.check_timer(self.T, self.previous_time_u2u, -0.1) and not self.back_to_base:
             self.previous_time_u2u = time.time()
@@ -290,7 +326,7 @@ class main_process(object):
         # communication layer
         while not self.ga2control_queue.empty():
             # task allocation thread to main thread
-            self.fitness, self.best_solution = self.ga2control_queue.get()
+            self.fitness, self.best_solution, self.ga_stats = self.ga2control_queue.get()
 
         if new_timer.check_timer(self.T, self.previous_time_u2u, -0.1) and not self.back_to_base:
             self.previous_time_u2u = time.time()
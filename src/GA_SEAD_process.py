@@ -3,8 +3,17 @@ import time
 import math
 import numpy as np
 import copy
+import json
 from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
 import dubins
+from dubins_vectorized import dubins_shortest_length, dubins_sample
+from fitness_cache import FitnessCache
+from selection import selection_methods, tournament_selection
+from ga_stats import GAStats
+import compiled_kernels
+from compiled_kernels import route_scan, sequence_penalty, scatter_genes
+from auction import sequential_auction
 
 
 class GA_SEAD(object):
@@ -25,18 +34,55 @@ class GA_SEAD(object):
         self.mutation_prob = [0.25, 0.25, 0.25, 0.25]
         self.crossover_prob = [0.5, 0.5]
         self.elitism_num = 2
+        self.selection_method = 'roulette'  # 'roulette', 'sus', 'tournament' or 'rank', see selection.py
+        self.tournament_size = 2
         self.lambda_1 = 0
         self.lambda_2 = 10
+        self.memetic = False  # local search on the elites every generation
+        self.memetic_time = 0.002  # time cap of the local search per generation (sec)
+        self.memetic_candidates = 32  # sampled moves per improvement step
+        self.auction_seed = False  # seed the population with the sequential auction solution on mission updates
         # the precomputed matrix for optimization
         self.uavType_for_missions = []
         self.tasks_status = [3 for _ in range(len(self.targets))]
-        self.cost_matrix = []
+        self.incremental_graph = True  # only compute the new targets when the target set changes
+        self.graph_cache = None  # CostGraphCache, reuse the graphs of previous sorties
+        self.lazy_graph = False  # compute the graph blocks when the evaluation first reaches them
+        self.graph_computed = {}  # Rmin: [slot, slot], the heading block of the slot pair is computed
+        self.dubins_table = None  # DubinsLengthTable, build the cost graphs by table lookups instead of the solver
+        self.cost_version = 0  # changed whenever the cost graph is updated
+        self.fitness_cache = FitnessCache()
+        self.delta_evaluation = False  # evaluate the mutants from the state of their parents, only for long routes
+        self.evaluated_population, self.evaluated_state = None, None  # last population passed to fitness_evaluate
+        self.islands = None  # IslandModel, evolve sub-populations in worker processes
+        self.fitness_pool = None  # FitnessPool, evaluate large batches in worker processes
+        self.stats = GAStats(self.fitness_cache)  # profile of the last run_GA_time_period_version call
+        self.cost_graph = {}  # Rmin: [slot, heading, slot, heading], shared by the UAVs of the same Rmin
+        self.cost_matrix = []  # view of each UAV into the cost graph of its Rmin
+        self.departure_cost = np.zeros((0, 0, 0), dtype=np.float32)  # [uav, slot, heading], slot 0: depot
+        self.arrival_cost = np.zeros((0, 0, 0), dtype=np.float32)  # [uav, slot, heading], slot 0: uav position
+        self.slot_target = [0]  # target id of each graph slot, slot 0: uav position / depot
+        self.target_slot = np.zeros(1, dtype=int)  # graph slot of each target id
+        self.uav_graph_class = np.zeros(0, dtype=int)  # index of the cost graph of each UAV
         self.discrete_heading = [_ for _ in range(0, 36)]  # N heading = 10
+        self.heading_dp = False  # fill the heading genes by dynamic programming over each UAV route
+        self.coarse_heading_step = None  # e.g. 4: plan on 40 deg headings first, then refine around the elites
+        self.coarse_fraction = 0.5  # share of the planning time spent on the coarse headings
+        self.target_heading = {}  # target id: headings of the target in the graph (gene unit, 10 deg)
+        self.coarse_targets = set()  # targets still on the coarse headings
+        self.heading_width = 0  # heading axis of the graph, the largest heading set of the targets
+        self.slot_headings = np.zeros((1, 1), dtype=int)  # [slot, heading axis] -> heading gene
+        self.slot_heading_num = np.ones(1, dtype=int)  # size of the heading set of each slot
+        self.heading_column = np.zeros((1, 36), dtype=int)  # [slot, heading gene] -> nearest heading axis
         self.remaining_targets = []
         self.task_amount_array = []
-        self.task_index_array = []
-        self.target_sequence = []
-        self.target_index_array = []
+        self.task_position, self.task_rank, self.task_target_index = None, None, None
+        self.task_target, self.task_type = None, None
+        self.capable_uav, self.capable_num = None, None
+        self.gene_dtype = np.int16
+        self.compiled_kernels = compiled_kernels.available  # numba kernels of the fitness and operators
+        self.uav_index = np.zeros(0, dtype=int)
+        self.uav_velocity_array = np.zeros(0)
 
     def fitness_evaluate_calculate(self, population):
         fitness_value = []
@@ -77,216 +123,834 @@ class GA_SEAD(object):
         roulette_wheel = np.array(fitness_value) / np.sum(fitness_value)
         return fitness_value, roulette_wheel
 
-    def fitness_evaluate(self, population):
-        fitness_value = []
+    def uav_routes(self, population):
+        '''
+        genes of an int population [chromosome, row, gene] grouped by UAV, keeping the visiting order
+            order : gene index of each route position
+            first, last : the position starts / ends a UAV route
+            heading : heading axis of the graph nearest to the heading gene
+        '''
+        uav = self.uav_index[population[:, 3]]
+        order = np.argsort(uav, axis=1, kind='stable')
+        uav = np.take_along_axis(uav, order, axis=1)
+        slot = self.target_slot[np.take_along_axis(population[:, 1], order, axis=1)]
+        heading = self.heading_column[slot, np.take_along_axis(population[:, 4], order, axis=1)]
+        first, last = np.ones(uav.shape, dtype=bool), np.ones(uav.shape, dtype=bool)
+        first[:, 1:] = last[:, :-1] = uav[:, 1:] != uav[:, :-1]
+        return order, uav, slot, heading, first, last
+
+    def leg_cost(self, uav, pre_slot, pre_heading, slot, heading):
+        '''
+        gather the cost of legs (arrays of the same shape) from the cost graph, pre_slot 0: from the UAV position
+        '''
+        cost = np.zeros(uav.shape)
+        departure = pre_slot == 0
+        cost[departure] = self.departure_cost[uav[departure], slot[departure], heading[departure]]
+        for k, (rmin, graph) in enumerate(self.cost_graph.items()):
+            leg = ~departure & (self.uav_graph_class[uav] == k)
+            if self.lazy_graph:
+                self.compute_graph_block(rmin, pre_slot[leg], slot[leg])
+            cost[leg] = graph[pre_slot[leg], pre_heading[leg], slot[leg], heading[leg]]
+        return cost
+
+    def as_population(self, population):
+        if isinstance(population, np.ndarray):
+            return population
+        return np.array(population, dtype=self.gene_dtype).reshape((len(population), 5, -1))
+
+    def decode_heading(self, population):
+        '''
+        optimal heading genes for the fixed routes (order, target, type, uav) of an int population, Viterbi over
+        the heading axis of each slot, minimizing the flight distance of every UAV route, O(gene * heading^2)
+        '''
+        chromosome_num, gene_num = population.shape[0], population.shape[2]
+        order, uav, slot, _, first, last = self.uav_routes(population)
+        pre_slot = np.roll(slot, 1, axis=1)
+        chromosome_index = np.arange(chromosome_num)
+        # [gene, heading from, chromosome, heading to], the reduction over the heading from is contiguous
+        leg = np.zeros((gene_num, self.heading_width, chromosome_num, self.heading_width), dtype=np.float32)
+        for k, (rmin, graph) in enumerate(self.cost_graph.items()):
+            chromosome, gene = np.nonzero(~first & (self.uav_graph_class[uav] == k))
+            if self.lazy_graph:
+                self.compute_graph_block(rmin, pre_slot[chromosome, gene], slot[chromosome, gene])
+            leg.transpose(0, 2, 1, 3)[gene, chromosome] = \
+                graph.transpose(0, 2, 1, 3)[pre_slot[chromosome, gene], slot[chromosome, gene]]
+        departure, arrival = self.departure_cost[uav, slot], self.arrival_cost[uav, slot]
+        value = np.zeros((gene_num, chromosome_num, self.heading_width), dtype=np.float32)  # shortest distance
+        value[0] = departure[:, 0]
+        for j in range(1, gene_num):
+            value[j] = np.where(first[:, j, None], departure[:, j], np.min(value[j - 1].T[:, :, None] + leg[j], axis=0))
+        # backtrack from the end of each route
+        column = np.zeros((chromosome_num, gene_num), dtype=int)
+        column[:, -1] = np.argmin(value[-1] + arrival[:, -1], axis=1)
+        for j in range(gene_num - 2, -1, -1):
+            column[:, j] = np.where(last[:, j], np.argmin(value[j] + arrival[:, j], axis=1),
+                                    np.argmin(value[j].T + leg[j + 1][:, chromosome_index, column[:, j + 1]], axis=0))
+        population = population.copy()
+        np.put_along_axis(population[:, 4], order, self.slot_headings[slot, column].astype(population.dtype), axis=1)
+        return population
+
+    def population_objectives(self, population, touched=None, parent_cost=None, parent_arrival_time=None):
+        '''
+        batched objectives of an int population [chromosome, row, gene]
+            cost : flight distance of each UAV [chromosome, uav]
+            arrival_time : arrival time of each gene [chromosome, gene]
+            penalty : time sequence penalty [chromosome]
+        delta evaluation: only the routes of the touched UAVs [chromosome, uav] are walked again, the others are
+        taken from parent_cost and parent_arrival_time
+        '''
+        population = self.as_population(population)
+        chromosome_num, gene_num = population.shape[0], population.shape[2]
+        order, uav, slot, heading, first, last = self.uav_routes(population)
+        pre_slot, pre_heading = np.roll(slot, 1, axis=1), np.roll(heading, 1, axis=1)
+        pre_slot[first] = 0
+        routed = np.ones(uav.shape, dtype=bool) if touched is None else np.take_along_axis(touched, uav, axis=1)
+        leg = np.zeros(uav.shape)
+        leg[routed] = self.leg_cost(uav[routed], pre_slot[routed], pre_heading[routed], slot[routed], heading[routed])
+        if self.compiled_kernels:
+            cost, arrival_time = route_scan(order, uav, slot, heading, leg, first, self.uav_velocity_array,
+                                            self.arrival_cost)
+        else:
+            # cumulative distance along each UAV route (segmented scan)
+            distance = np.cumsum(leg, axis=1)
+            route_start = np.maximum.accumulate(np.where(first, np.arange(gene_num), 0), axis=1)
+            distance -= np.take_along_axis(distance - leg, route_start, axis=1)
+            arrival_time = np.zeros(distance.shape)
+            np.put_along_axis(arrival_time, order, distance / self.uav_velocity_array[uav], axis=1)
+            # flight distance back to the depot
+            cost = np.tile(self.arrival_cost[:, 0, 0].astype(float), (chromosome_num, 1))
+            chromosome_index = np.nonzero(last)[0]
+            cost[chromosome_index, uav[last]] = distance[last] + self.arrival_cost[uav[last], slot[last], heading[last]]
+        if touched is not None:
+            arrival_time = np.where(np.take_along_axis(touched, self.uav_index[population[:, 3]], axis=1),
+                                    arrival_time, parent_arrival_time)
+            cost = np.where(touched, cost, parent_cost)
+        status = np.array([0] + self.tasks_status)
+        if self.compiled_kernels:
+            return cost, arrival_time, sequence_penalty(population[:, 1], population[:, 2], arrival_time, status)
+        # time sequence penalty: arrival times scattered into a [target, task type] table
+        time_table = np.zeros((chromosome_num, len(self.targets) + 1, 4))
+        time_table[np.repeat(np.arange(chromosome_num), gene_num), population[:, 1].ravel(),
+                   population[:, 2].ravel()] = arrival_time.ravel()
+        penalty = np.sum(np.maximum(0, time_table[:, :, 1] - time_table[:, :, 2]) * (status >= 3), axis=1) + \
+            np.sum(np.maximum(0, time_table[:, :, 2] - time_table[:, :, 3]) * (status >= 2), axis=1)
+        return cost, arrival_time, penalty
+
+    def objectives_value(self, cost, penalty):
+        mission_time = np.max(cost / self.uav_velocity_array, axis=-1)
+        total_distance = np.sum(cost, axis=-1)
+        return 1 / (mission_time + self.lambda_1 * total_distance + self.lambda_2 * penalty), mission_time, total_distance
+
+    def population_state(self, population, touched=None, parent_state=None):
+        '''
+        [fitness, mission time, total distance, penalty, cost of each uav..., arrival time of each gene...]
+        '''
         uav_num = len(self.uav_id)
-        for chromosome in population:
-            cost = [0 for _ in range(uav_num)]
-            task_sequence_time = [[] for _ in range(uav_num)]  # time
-            time_list = []
-            pre_site, pre_heading = [0 for _ in range(uav_num)], [0 for _ in range(uav_num)]
-            for j in range(len(chromosome[0])):
-                assign_uav = self.uav_id.index(chromosome[3][j])
-                assign_target = chromosome[1][j]
-                assign_heading = chromosome[4][j]
-                cost[assign_uav] += self.cost_matrix[assign_uav][pre_site[assign_uav]][pre_heading[assign_uav]][assign_target][assign_heading]
-                task_sequence_time[assign_uav].append([assign_target, chromosome[2][j],
-                                                       cost[assign_uav] / self.uav_velocity[assign_uav]])
-                pre_site[assign_uav], pre_heading[assign_uav] = assign_target, assign_heading
-            for j in range(uav_num):
-                cost[j] += self.cost_matrix[j][pre_site[j]][pre_heading[j]][0][0]
-            for sequence in task_sequence_time:
-                time_list.extend(sequence)
-            time_list.sort()
-            # time sequence penalty
-            penalty, j = 0, 0
-            for task_num in self.tasks_status:
-                if task_num >= 2:
-                    for k in range(1, task_num):
-                        penalty += max(0, time_list[j+k-1][2] - time_list[j+k][2])
-                j += task_num
-            fitness_value.extend([1 / (np.max(np.divide(cost, self.uav_velocity))
-                                       + self.lambda_1 * np.sum(cost)
-                                       + self.lambda_2 * penalty)])
-        roulette_wheel = np.array(fitness_value) / np.sum(fitness_value)
-        return fitness_value, roulette_wheel
+        if parent_state is None and self.fitness_pool and len(population) >= self.fitness_pool.min_batch:
+            return self.fitness_pool.population_state(self, population)
+        if parent_state is None:
+            cost, arrival_time, penalty = self.population_objectives(population)
+        else:
+            cost, arrival_time, penalty = self.population_objectives(population, touched, parent_state[:, 4:4 + uav_num],
+                                                                     parent_state[:, 4 + uav_num:])
+        return np.column_stack(self.objectives_value(cost, penalty) + (penalty, cost, arrival_time))
+
+    def cached_state(self, population):
+        '''
+        population_state of each chromosome, only the chromosomes missing in the fitness cache are evaluated
+        '''
+        population = self.as_population(population)
+        if self.fitness_cache is None:
+            return self.population_state(population)
+        self.fitness_cache.validate((self.cost_version, tuple(self.tasks_status)))
+        state, missing, delta = np.zeros((len(population), 4 + len(self.uav_id) + population.shape[2])), {}, 0
+        for i, chromosome in enumerate(population):
+            key = chromosome.tobytes()
+            value = self.fitness_cache.get(key)
+            if value is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                state[i] = value
+                delta += self.fitness_cache.delta_hit(key)
+        self.fitness_cache.record(len(population) - len(missing) - delta, len(missing), delta)
+        if missing:
+            values = self.population_state(population[[index[0] for index in missing.values()]])
+            for (key, index), value in zip(missing.items(), values):
+                state[index] = value
+                self.fitness_cache.put(key, value)
+        return state
+
+    def delta_evaluate(self, children, parents):
+        '''
+        evaluate the children of local moves into the fitness cache, only the routes of the UAVs touched by the
+        operator are walked again and the rest of the state is reused from the parents (not with heading_dp, the
+        headings of the children change again when they are decoded), opt-in by delta_evaluation: the batched
+        evaluation of the whole population is faster on short routes
+        '''
+        if not self.delta_evaluation or self.fitness_cache is None or not len(children) or self.heading_dp or \
+                self.fitness_cache.token != (self.cost_version, tuple(self.tasks_status)):
+            return
+        parent = self.evaluated_population[parents]
+        changed = children != parent
+        chromosome_index, _, gene_index = np.nonzero(changed)
+        touched = np.zeros((len(children), len(self.uav_id)), dtype=bool)
+        touched[chromosome_index, self.uav_index[parent[chromosome_index, 3, gene_index]]] = True
+        touched[chromosome_index, self.uav_index[children[chromosome_index, 3, gene_index]]] = True
+        state = self.population_state(children, touched, self.evaluated_state[parents])
+        for chromosome, value in zip(children, state):
+            self.fitness_cache.put(chromosome.tobytes(), value, delta=True)
+
+    def fitness_evaluate(self, population):
+        if self.heading_dp and isinstance(population, np.ndarray) and len(population):
+            population[:] = self.decode_heading(population)  # the optimal headings are written back
+        state = self.cached_state(population)
+        self.evaluated_population, self.evaluated_state = population, state
+        fitness_value = state[:, 0]
+        roulette_wheel = fitness_value / np.sum(fitness_value)
+        return fitness_value.tolist(), roulette_wheel
 
     def chromosome_objectives_evaluate(self, chromosome):
-        uav_num = len(self.uav_id)
-        cost = [0 for _ in range(uav_num)]
-        task_sequence_time = [[] for _ in range(uav_num)]  # time
-        time_list = []
-        pre_site, pre_heading = [0 for _ in range(uav_num)], [0 for _ in range(uav_num)]
-        for j in range(len(chromosome[0])):
-            assign_uav = self.uav_id.index(chromosome[3][j])
-            assign_target = chromosome[1][j]
-            assign_heading = chromosome[4][j]
-            cost[assign_uav] += self.cost_matrix[assign_uav][pre_site[assign_uav]][pre_heading[assign_uav]][assign_target][assign_heading]
-            task_sequence_time[assign_uav].append([assign_target, chromosome[2][j],
-                                                   cost[assign_uav] / self.uav_velocity[assign_uav]])
-            pre_site[assign_uav], pre_heading[assign_uav] = assign_target, assign_heading
-        for j in range(uav_num):
-            cost[j] += self.cost_matrix[j][pre_site[j]][pre_heading[j]][0][0]
-        for sequence in task_sequence_time:
-            time_list.extend(sequence)
-        time_list.sort()
-        # time sequence penalty
-        penalty, j = 0, 0
-        for task_num in self.tasks_status:
-            if task_num >= 2:
-                for k in range(1, task_num):
-                    penalty += max(0, time_list[j + k - 1][2] - time_list[j + k][2])
-            j += task_num
-        mission_time = np.max(np.divide(cost, self.uav_velocity))
-        total_distance = np.sum(cost)
-        fittness = 1 / (mission_time + self.lambda_1 * total_distance + self.lambda_2 * penalty)
+        fittness, mission_time, total_distance, penalty = self.cached_state([chromosome])[0][:4]
         return fittness, mission_time, total_distance, penalty
 
+    @staticmethod
+    def cost_matrix_nbytes(rmin_num, uav_num, target_num, heading_num=36, dtype=np.float32):
+        '''
+        bytes of the cost graph of a mission before it is built, cost_matrix_memory()['bytes'] once built
+        '''
+        return (rmin_num * ((target_num + 1) * heading_num) ** 2 + 2 * uav_num * (target_num + 1) * heading_num) * \
+            np.dtype(dtype).itemsize
+
+    def cost_matrix_memory(self):
+        '''
+        memory usage of the cost graph, for sizing missions against the onboard RAM
+            per_uav_bytes : size of the graph without sharing between the UAVs of the same Rmin
+            nested_list_bytes : estimated size of the unshared graph stored as nested lists of python floats
+        '''
+        graph_bytes = sum(graph.nbytes for graph in self.cost_graph.values())
+        realtime_bytes = self.departure_cost.nbytes + self.arrival_cost.nbytes
+        per_uav_size = sum(graph.size for graph in self.cost_matrix) + self.departure_cost.size + self.arrival_cost.size
+        return {'rmin_classes': sorted(self.cost_graph), 'slots': len(self.slot_target), 'headings': self.heading_width,
+                'dtype': str(self.departure_cost.dtype),
+                'graph_bytes': graph_bytes, 'realtime_bytes': realtime_bytes, 'bytes': graph_bytes + realtime_bytes,
+                'per_uav_bytes': per_uav_size * self.departure_cost.itemsize,
+                'nested_list_bytes': per_uav_size * (24 + 8)}
+
+    def set_population_size(self, population_size):
+        '''
+        population size of each generation, the elites, crossover children and mutation children add up to it
+        '''
+        self.population_size = max(population_size, self.elitism_num + 2)
+        self.crossover_num = round((self.population_size - self.elitism_num) * 0.67)
+        self.mutation_num = self.population_size - self.crossover_num - self.elitism_num
+
+    def unassigned_task_types(self):
+        '''
+        remaining task types without a capable UAV, the mission has no solution
+        '''
+        return [task_type + 1 for task_type in range(3)
+                if self.task_amount_array[task_type] and not self.capable_num[task_type]]
+
     def generate_population(self):
-        def generate_chromosome():
-            chromosome = np.zeros((5, sum(self.tasks_status)), dtype=int)
-            for i in range(chromosome.shape[1]):
-                chromosome[0][i] = i + 1  # order
-                chromosome[1][i] = random.choice([n for n in range(1, len(self.targets) + 1)  # target id
-                                                  if np.count_nonzero(chromosome[1] == n) < self.tasks_status[n - 1]])
-            # turn to target-based
-            target_based_gene = self.order2target_bundle(chromosome)
-            for i in range(len(target_based_gene)):
-                target_based_gene[i][2] = mission_type_list[i]  # mission type
-                target_based_gene[i][3] = random.choice(
-                    self.uavType_for_missions[target_based_gene[i][2] - 1])  # uav id
-                target_based_gene[i][4] = random.choice(self.discrete_heading)  # heading angle
-            return self.target_bundle2order(target_based_gene)  # back to order-based
-        mission_type_list = []
-        for tasks in self.tasks_status:
-            mission_type_list.extend([n + 1 for n in range(3 - tasks, 3)])
-        return [generate_chromosome() for _ in range(self.population_size)]
+        '''
+        random population built at once in target-based form: the order positions are a random permutation of the
+        tasks with the types ascending within each target, the UAVs are drawn from the capable UAVs of the task type
+        and the headings from the heading set of the target
+        '''
+        unassigned = self.unassigned_task_types()
+        if unassigned:
+            raise ValueError(f'no capable UAV for the task types {unassigned}')
+        chromosome_num, gene_num = self.population_size, len(self.task_target)
+        position = np.argsort(np.argsort(np.random.random((chromosome_num, gene_num)), axis=1), axis=1)
+        position = np.sort(self.task_target_index * gene_num + position, axis=1) % gene_num
+        slot = self.target_slot[self.task_target]
+        bundle = np.empty((chromosome_num, 5, gene_num), dtype=self.gene_dtype)
+        bundle[:, 0] = position + 1
+        bundle[:, 1] = self.task_target
+        bundle[:, 2] = self.task_type
+        bundle[:, 3] = self.capable_uav[self.task_type - 1, (np.random.random((chromosome_num, gene_num)) *
+                                                             self.capable_num[self.task_type - 1]).astype(int)]
+        bundle[:, 4] = self.slot_headings[slot, (np.random.random((chromosome_num, gene_num)) *
+                                                 self.slot_heading_num[slot]).astype(int)]
+        return self.bundle2order(bundle)
 
-    @staticmethod
-    def selection(roulette_wheel, num):
-        return np.random.choice(np.arange(len(roulette_wheel)), size=num, replace=False, p=roulette_wheel)
+    def repair_population(self, population, clear_task, new_task):
+        '''
+        the evolved population patched to the updated mission instead of a new random population
+            finished tasks : their genes are removed
+            lost UAVs : their genes go to random capable UAVs
+            new targets : the tasks are inserted one by one on a random capable UAV and heading, at the order position
+                          of the least extra flight distance of that UAV route, after the former task of the target
+        chromosomes that do not match the remaining tasks (e.g. elites of an older mission) are generated again
+        '''
+        population = self.as_population(population).astype(self.gene_dtype)
+        finished = np.zeros((len(self.targets) + 1, 4), dtype=bool)
+        for target, task_type in clear_task:
+            finished[target, task_type] = True
+        keep = ~finished[population[:, 1], population[:, 2]]
+        population = population[np.sum(keep, axis=1) == population.shape[2] - len(clear_task)]
+        keep = ~finished[population[:, 1], population[:, 2]]
+        population = population.transpose(0, 2, 1)[keep].reshape((len(population), -1, 5)).transpose(0, 2, 1)
+        # lost UAVs
+        uav_id = population[:, 3].astype(int)
+        lost = (uav_id >= len(self.uav_index)) | (self.uav_index[np.minimum(uav_id, len(self.uav_index) - 1)] < 0)
+        task_type = population[:, 2][lost] - 1
+        population[:, 3][lost] = self.capable_uav[task_type, (np.random.random(len(task_type)) *
+                                                              self.capable_num[task_type]).astype(int)]
+        # new targets, cheapest insertion
+        for target in new_task:
+            slot = self.target_slot[target]
+            position = np.full(len(population), -1)
+            for task_type in range(1, 4):
+                population, position = self.insert_task(population, target, task_type, slot, position)
+        population[:, 0] = np.arange(1, population.shape[2] + 1)
+        # chromosomes of the remaining tasks only
+        task_key = np.sort(population[:, 1].astype(int) * 4 + population[:, 2], axis=1)
+        valid = np.all(task_key == np.sort(self.task_target * 4 + self.task_type), axis=1) if \
+            population.shape[2] == len(self.task_target) else np.zeros(len(population), dtype=bool)
+        missing = self.population_size - np.count_nonzero(valid)
+        if missing > 0:
+            return np.concatenate([population[valid], self.generate_population()[:missing]])
+        return population[valid]
 
-    @staticmethod
-    def order2target_bundle(chromosome):
-        zipped_gene = [list(g) for g in zip(chromosome[0], chromosome[1], chromosome[2], chromosome[3], chromosome[4])]
-        return sorted(sorted(zipped_gene, key=lambda u: u[2]), key=lambda u: u[1])
+    def insert_task(self, population, target, task_type, slot, position):
+        '''
+        insert the task of every chromosome after its order position, at the least extra flight distance
+            return : population and the order position of the inserted genes
+        '''
+        chromosome_num, gene_num = population.shape[0], population.shape[2]
+        chromosome_index, gene_index = np.arange(chromosome_num), np.arange(gene_num)
+        uav_id = self.capable_uav[task_type - 1, (np.random.random(chromosome_num) *
+                                                  self.capable_num[task_type - 1]).astype(int)]
+        uav, heading_num = self.uav_index[uav_id], self.slot_heading_num[slot]
+        column = (np.random.random(chromosome_num) * heading_num).astype(int)
+        # previous and next gene of the UAV around each insert position [chromosome, position]
+        route = self.uav_index[population[:, 3]] == uav[:, None]
+        previous = np.full((chromosome_num, gene_num + 1), -1)
+        previous[:, 1:] = np.maximum.accumulate(np.where(route, gene_index, -1), axis=1)
+        following = np.full((chromosome_num, gene_num + 1), gene_num)
+        following[:, :-1] = np.minimum.accumulate(np.where(route, gene_index, gene_num)[:, ::-1], axis=1)[:, ::-1]
+        gene_slot = self.target_slot[population[:, 1]]
+        gene_column = self.heading_column[gene_slot, population[:, 4]]
+        pre_slot = np.where(previous >= 0, np.take_along_axis(gene_slot, np.maximum(previous, 0), axis=1), 0)
+        pre_column = np.where(previous >= 0, np.take_along_axis(gene_column, np.maximum(previous, 0), axis=1), 0)
+        end = following == gene_num  # back to the depot
+        next_slot = np.take_along_axis(gene_slot, np.minimum(following, gene_num - 1), axis=1) if gene_num else \
+            np.zeros_like(following)
+        next_column = np.take_along_axis(gene_column, np.minimum(following, gene_num - 1), axis=1) if gene_num else \
+            np.zeros_like(following)
+        uav_grid = np.repeat(uav[:, None], gene_num + 1, axis=1)
+        new_slot, new_column = np.full(uav_grid.shape, slot), np.repeat(column[:, None], gene_num + 1, axis=1)
+        extra = self.leg_cost(uav_grid, pre_slot, pre_column, new_slot, new_column)
+        extra[end] += self.arrival_cost[uav_grid[end], slot, new_column[end]]
+        extra[~end] += self.leg_cost(uav_grid[~end], new_slot[~end], new_column[~end], next_slot[~end],
+                                     next_column[~end])
+        extra[end] -= self.arrival_cost[uav_grid[end], pre_slot[end], pre_column[end]]
+        extra[~end] -= self.leg_cost(uav_grid[~end], pre_slot[~end], pre_column[~end], next_slot[~end],
+                                     next_column[~end])
+        extra[np.arange(gene_num + 1) <= position[:, None]] = np.inf  # after the former task of the target
+        insert = np.argmin(extra, axis=1)
+        # shift the genes from the insert position
+        source = np.arange(gene_num + 1) - (np.arange(gene_num + 1) > insert[:, None])
+        inserted = np.take_along_axis(population, np.repeat(np.minimum(source, gene_num - 1)[:, None], 5, axis=1),
+                                      axis=2) if gene_num else np.zeros((chromosome_num, 5, 1), dtype=population.dtype)
+        inserted[chromosome_index, 1:, insert] = np.column_stack([np.full(chromosome_num, target),
+                                                                  np.full(chromosome_num, task_type), uav_id,
+                                                                  self.slot_headings[slot, column]])
+        return inserted, insert
 
-    @staticmethod
-    def order2task_bundle(chromosome):
-        zipped_gene = [list(g) for g in zip(chromosome[0], chromosome[1], chromosome[2], chromosome[3], chromosome[4])]
-        return sorted(zipped_gene, key=lambda u: u[2])
+    def selection(self, roulette_wheel, num):
+        '''
+        indices of num parents of the generation, drawn in one call
+        '''
+        if self.selection_method == 'tournament':
+            return tournament_selection(roulette_wheel, num, self.tournament_size)
+        return selection_methods[self.selection_method](roulette_wheel, num)
 
-    @staticmethod
-    def target_bundle2order(chromosome):
-        order_based_gene = np.array(sorted(chromosome, key=lambda u: u[0]))
-        return [[g[i] for g in order_based_gene] for i in range(5)]
+    def selection_pairs(self, roulette_wheel, pair_num):
+        '''
+        crossover parents [pair, 2], a chromosome paired with itself exchanges its mate with a pair of two other
+        chromosomes
+        '''
+        parents = self.selection(roulette_wheel, 2 * pair_num).reshape((pair_num, 2))
+        for k in np.flatnonzero(parents[:, 0] == parents[:, 1]):
+            other = np.flatnonzero(np.all(parents != parents[k, 0], axis=1))
+            if len(other):
+                parents[[k, other[0]], 1] = parents[[other[0], k], 1]
+        return parents
+
+    def order2bundle(self, population):
+        '''
+        order-based population -> target-based population, through the cached bundle position of each task
+        '''
+        position = self.task_position[population[:, 1], population[:, 2]]
+        if self.compiled_kernels:
+            return scatter_genes(population, position)
+        bundle = np.empty_like(population)
+        np.put_along_axis(bundle, np.repeat(position[:, None], 5, axis=1), population, axis=2)
+        return bundle
+
+    def bundle2order(self, bundle):
+        if self.compiled_kernels:
+            return scatter_genes(bundle, bundle[:, 0] - 1)
+        population = np.empty_like(bundle)
+        np.put_along_axis(population, np.repeat(bundle[:, :1] - 1, 5, axis=1), bundle, axis=2)
+        return population
 
     def crossover_operator(self, wheel, population):
-        def two_point_crossover(parent_1, parent_2):
-            target_based_gene = []
-            # turn to target-based
-            for parent in [parent_1, parent_2]:
-                target_based_gene.append(self.order2target_bundle(parent))
-            # choose cut point
-            cut_point_1, cut_point_2 = sorted(random.sample(range(len(parent_1[0])), 2))
-            cut_len = cut_point_2 - cut_point_1
-            target_based_gene[0][cut_point_1:cut_point_2], target_based_gene[1][cut_point_1:cut_point_2] = \
-                [target_based_gene[0][cut_point_1 + i][:3] + target_based_gene[1][cut_point_1 + i][3:] for i in range(cut_len)], \
-                [target_based_gene[1][cut_point_1 + i][:3] + target_based_gene[0][cut_point_1 + i][3:] for i in range(cut_len)]
-            # back to order-based
-            child_1 = self.target_bundle2order(target_based_gene[0])
-            child_2 = self.target_bundle2order(target_based_gene[1])
-            return [child_1, child_2]
-
-        def target_bundle_crossover(parent_1, parent_2):
-            target_based_gene = []
-            # turn to target-based
-            for parent in [parent_1, parent_2]:
-                target_based_gene.append(self.order2target_bundle(parent))
-            # select targets to exchange
-            targets_exchanged = random.sample(self.remaining_targets, random.randint(1, len(self.remaining_targets)))
-            for i in range(len(target_based_gene[0])):
-                if target_based_gene[0][i][1] in targets_exchanged:
-                    target_based_gene[0][i], target_based_gene[1][i] = \
-                        target_based_gene[0][i][:3] + target_based_gene[1][i][3:], \
-                        target_based_gene[1][i][:3] + target_based_gene[0][i][3:]
-            # back to order-based
-            child_1 = self.target_bundle2order(target_based_gene[0])
-            child_2 = self.target_bundle2order(target_based_gene[1])
-            return [child_1, child_2]
-        children = []
-        for k in range(0, self.crossover_num, 2):
-            p_1, p_2 = self.selection(wheel, 2)
-            children.extend(np.random.choice([two_point_crossover, target_bundle_crossover],
-                                             p=self.crossover_prob)(population[p_1], population[p_2]))
-        return children
+        parents = self.selection_pairs(wheel, (self.crossover_num + 1) // 2)
+        pair_num, gene_num = parents.shape[0], population.shape[2]
+        bundle_1, bundle_2 = self.order2bundle(population[parents[:, 0]]), self.order2bundle(population[parents[:, 1]])
+        two_point = np.random.random(pair_num) < self.crossover_prob[0]
+        exchange = np.zeros((pair_num, gene_num), dtype=bool)
+        # two point crossover: exchange uav and heading between the cut points
+        if gene_num >= 2:
+            cut_point_1, cut_point_2 = np.random.randint(0, gene_num, pair_num), np.random.randint(0, gene_num - 1, pair_num)
+            cut_point_2 += cut_point_2 >= cut_point_1
+            cut_point_1, cut_point_2 = np.minimum(cut_point_1, cut_point_2), np.maximum(cut_point_1, cut_point_2)
+            gene = np.arange(gene_num)
+            exchange[two_point] = ((gene >= cut_point_1[:, None]) & (gene < cut_point_2[:, None]))[two_point]
+        # target bundle crossover: exchange uav and heading of the selected targets
+        target_num = len(self.remaining_targets)
+        exchanged_num = np.random.randint(1, target_num + 1, pair_num)
+        targets_exchanged = np.argsort(np.argsort(np.random.random((pair_num, target_num)), axis=1), axis=1) < \
+            exchanged_num[:, None]
+        exchange[~two_point] = targets_exchanged[:, self.task_target_index][~two_point]
+        exchange = exchange[:, None, :] & (np.arange(5) >= 3)[None, :, None]
+        children = np.stack([np.where(exchange, bundle_2, bundle_1), np.where(exchange, bundle_1, bundle_2)], axis=1)
+        return self.bundle2order(children.reshape((2 * pair_num,) + population.shape[1:]))
+
+    def target_bundle_mutation(self, population):
+        '''
+        targets of the same task number exchange their order in the chromosome
+        '''
+        bundle = self.order2bundle(population)
+        task_num = np.array(self.tasks_status)[np.array(self.remaining_targets) - 1]
+        shuffle_sequence = np.argsort(task_num + np.random.random((len(population), len(task_num))), axis=1)
+        sequence_len = task_num[shuffle_sequence]
+        start = np.zeros_like(shuffle_sequence)
+        np.put_along_axis(start, shuffle_sequence, np.cumsum(sequence_len, axis=1) - sequence_len, axis=1)
+        destination = start[:, self.task_target_index] + self.task_rank
+        mutate_bundle = bundle.copy()
+        np.put_along_axis(mutate_bundle[:, 1:], np.repeat(destination[:, None], 4, axis=1), bundle[:, 1:], axis=2)
+        return self.bundle2order(mutate_bundle)
+
+    def task_bundle_mutation(self, population, mut_task):
+        '''
+        the genes of the same task type exchange their assigned uav and heading, the heading is snapped to the
+        heading set of its new target
+        '''
+        population = population.copy()
+        for task_type in range(3):
+            mutated, task_amount = mut_task == task_type, self.task_amount_array[task_type]
+            if task_amount < 2 or not np.any(mutated):
+                continue
+            chromosome = population[mutated]
+            position = np.argsort(chromosome[:, 2] != task_type + 1, axis=1, kind='stable')[:, :task_amount]
+            sequence = np.take_along_axis(position, np.argsort(np.random.random(position.shape), axis=1), axis=1)
+            gene = np.take_along_axis(chromosome[:, 3:], np.repeat(sequence[:, None], 2, axis=1), axis=2)
+            np.put_along_axis(chromosome[:, 3:], np.repeat(position[:, None], 2, axis=1), gene, axis=2)
+            population[mutated] = chromosome
+        return self.snap_heading(population)
 
     def mutation_operator(self, wheel, population):
-        def point_agent_mutation(chromosome):
-            # choose a point to mutate
-            mut_point = np.random.randint(0, len(chromosome[0]))
-            # mutate assign uav or heading angle
-            new_gene = []
-            for i in range(len(chromosome)):  # copy chromosome
-                new_gene.append(chromosome[i][:])
-            # mutate assign uav
-            new_gene[3][mut_point] = random.choice([i for i in self.uavType_for_missions[new_gene[2][mut_point] - 1]])
-            return new_gene
-
-        def point_heading_mutation(chromosome):
-            # choose a point to mutate
-            mut_point = np.random.randint(0, len(chromosome[0]))
-            new_gene = []
-            for i in range(len(chromosome)):  # copy chromosome
-                new_gene.append(chromosome[i][:])
-            # mutate assign heading
-            new_gene[4][mut_point] = random.choice([i for i in self.discrete_heading if i != chromosome[4][mut_point]])
-            return new_gene
-
-        def target_bundle_mutation(chromosome):
-            # turn to target-based
-            target_based_gene = self.order2target_bundle(chromosome)
-            for task_type in self.target_sequence:
-                random.shuffle(task_type)
-            shuffle_sequence = self.target_sequence[0] + self.target_sequence[1] + self.target_sequence[2]
-            mutate_target_based = [[] for _ in range(len(target_based_gene))]
-            j = 0
-            for sequence in shuffle_sequence:
-                mutate_target_based[j:j + self.tasks_status[sequence]] = \
-                    [[b[:1] for b in target_based_gene[j:j + self.tasks_status[sequence]]][i] +
-                     [a[1:] for a in target_based_gene[self.target_index_array[sequence]:self.target_index_array[sequence + 1]]]
-                     [i] for i in range(self.tasks_status[sequence])]
-                j += self.tasks_status[sequence]
-            # back to order-based
-            return self.target_bundle2order(mutate_target_based)
-
-        def task_bundle_mutation(chromosome):
-            # turn to target-based
-            task_based_gene = self.order2task_bundle(chromosome)
-            # choose a task to mutate
-            mut_task = np.random.randint(0, 3)
-            # shuffle the state
-            task_sequence = list(range(self.task_amount_array[mut_task]))
-            random.shuffle(task_sequence)
-            # task mutate
-            mutate_task_based = []
-            for i in range(len(task_based_gene)):  # copy chromosome
-                mutate_task_based.append(task_based_gene[i][:])
-            # mutate_task_based = copy.deepcopy(task_based_gene)
-            for i, sequence in enumerate(task_sequence):
-                mutate_task_based[self.task_index_array[mut_task] + i][3:] = \
-                    task_based_gene[self.task_index_array[mut_task] + sequence][3:]
-            # back to order-based
-            order_based_gene = np.array(sorted(mutate_task_based, key=lambda u: u[0]))
-            return [[g[i] for g in order_based_gene] for i in range(5)]
-
-        mutation_operators = [point_agent_mutation, point_heading_mutation, target_bundle_mutation, task_bundle_mutation]
-        return [np.random.choice(mutation_operators, p=self.mutation_prob)(population[self.selection(wheel, 1)[0]])
-                for _ in range(self.mutation_num)]
+        parents = self.selection(wheel, self.mutation_num)
+        children = population[parents]
+        chromosome_num, gene_num = children.shape[0], children.shape[2]
+        probability = np.array(self.mutation_prob, dtype=float)
+        if self.heading_dp:  # decode_heading overwrites the headings, a heading mutant is a wasted evaluation
+            probability[1] = 0
+        operator = np.random.choice(4, size=chromosome_num, p=probability / np.sum(probability))
+        index = np.arange(chromosome_num)
+        mut_point = np.random.randint(0, gene_num, chromosome_num)
+        # point agent mutation
+        mutated = operator == 0
+        task_type = children[index, 2, mut_point] - 1
+        assign_uav = self.capable_uav[task_type, (np.random.random(chromosome_num) *
+                                                  self.capable_num[task_type]).astype(int)]
+        children[index[mutated], 3, mut_point[mutated]] = assign_uav[mutated]
+        # point heading mutation
+        mutated = operator == 1
+        slot = self.target_slot[children[index, 1, mut_point]]
+        heading_num = self.slot_heading_num[slot]
+        column = self.heading_column[slot, children[index, 4, mut_point]] + 1 + \
+            (np.random.random(chromosome_num) * (heading_num - 1)).astype(int)
+        children[index[mutated], 4, mut_point[mutated]] = self.slot_headings[slot, column % heading_num][mutated]
+        # target bundle mutation
+        mutated = operator == 2
+        children[mutated] = self.target_bundle_mutation(children[mutated])
+        # task bundle mutation
+        mutated = operator == 3
+        children[mutated] = self.task_bundle_mutation(children[mutated],
+                                                      np.random.randint(0, 3, np.count_nonzero(mutated)))
+        if self.evaluated_population is population:
+            self.delta_evaluate(children, parents)
+        return children
+
+    def population_diversity(self, population, best):
+        '''
+        mean share of the genes of a chromosome that differ from the best chromosome in target, type, uav or heading
+        '''
+        if not len(population) or not len(best):
+            return 0
+        population, best = self.as_population(population), np.asarray(best)
+        return np.mean(np.any(population[:, 1:] != best[None, 1:], axis=1))
 
     def elitism_operator(self, fitness, population):
-        fitness_ranking = sorted(range(len(fitness)), key=lambda u: fitness[u], reverse=True)[:self.elitism_num]
-        return [population[_] for _ in fitness_ranking]
+        fitness_ranking = np.argsort(-np.asarray(fitness), kind='stable')[:self.elitism_num]
+        return population[fitness_ranking]
+
+    def local_moves(self, chromosome, num):
+        '''
+        sampled neighbours of a chromosome
+            2-opt : reverse a segment of one UAV route
+            relocate : move a task into the route of another capable UAV
+            swap : exchange two tasks between routes, each UAV capable of the other task
+        '''
+        gene_num = chromosome.shape[1]
+        candidates = np.repeat(chromosome[None], num, axis=0)
+        for n, move in enumerate(np.random.randint(0, 3, num)):
+            candidate = candidates[n]
+            i, j = np.random.randint(0, gene_num, 2)
+            if move == 0:
+                route = np.nonzero(candidate[3] == candidate[3, i])[0]
+                if len(route) >= 2:
+                    a, b = np.sort(np.random.choice(len(route), 2, replace=False))
+                    segment = route[a:b + 1]
+                    candidate[np.ix_([1, 2, 4], segment)] = candidate[np.ix_([1, 2, 4], segment[::-1])]
+            elif move == 1:
+                task_type = candidate[2, i] - 1
+                gene = candidate[:, i].copy()
+                gene[3] = self.capable_uav[task_type, np.random.randint(self.capable_num[task_type])]
+                candidate[1:] = np.insert(np.delete(candidate[1:], i, axis=1), j, gene[1:], axis=1)
+            elif candidate[3, i] in self.uavType_for_missions[candidate[2, j] - 1] and \
+                    candidate[3, j] in self.uavType_for_missions[candidate[2, i] - 1]:
+                candidate[np.ix_([1, 2, 4], [i, j])] = candidate[np.ix_([1, 2, 4], [j, i])]
+        return candidates
+
+    def local_search(self, population, deadline):
+        '''
+        memetic stage, best improvement hill climbing on each chromosome until the deadline (time.time()), the
+        sampled moves are evaluated in one batch and accepted on the fitness, so the time sequence penalty counts
+        '''
+        population = population.copy()
+        for n in range(len(population)):
+            fitness = self.cached_state(population[n:n + 1])[0, 0]
+            while time.time() < deadline:
+                candidates = self.local_moves(population[n], self.memetic_candidates)
+                if self.heading_dp:
+                    candidates = self.decode_heading(candidates)
+                candidate_fitness = self.population_state(candidates)[:, 0]
+                best = np.argmax(candidate_fitness)
+                if candidate_fitness[best] <= fitness:
+                    break
+                population[n], fitness = candidates[best], candidate_fitness[best]
+        return population
+
+    def next_generation(self, fitness, wheel, population):
+        start = time.perf_counter()
+        elites = self.elitism_operator(fitness, population)
+        start = self.stats.add('elitism', start)
+        if self.memetic:
+            elites = self.local_search(elites, time.time() + self.memetic_time)
+            start = self.stats.add('memetic', start)
+        crossover_children = self.crossover_operator(wheel, population)
+        start = self.stats.add('crossover', start)
+        mutation_children = self.mutation_operator(wheel, population)
+        self.stats.add('mutation', start)
+        return np.concatenate([elites, crossover_children, mutation_children])
+
+    def evolve(self, population, deadline):
+        '''
+        evolve the population until the deadline (time.time()), on the islands when they are set
+        '''
+        if self.islands:
+            population, fitness = self.islands.evolve(self, population, deadline)
+            self.stats.generation(max(fitness), sum(self.islands.generations))
+            return population, fitness
+        start = time.perf_counter()
+        fitness, wheel = self.fitness_evaluate(population)
+        self.stats.add('fitness', start)
+        while time.time() <= deadline:
+            population = self.next_generation(fitness, wheel, population)
+            start = time.perf_counter()
+            fitness, wheel = self.fitness_evaluate(population)
+            self.stats.add('fitness', start)
+            self.stats.generation(max(fitness))
+        return population, fitness
+
+    def coarse_heading(self):
+        if not self.coarse_heading_step:
+            return list(self.discrete_heading)
+        return [heading for heading in self.discrete_heading if heading % self.coarse_heading_step == 0]
+
+    def refine_heading(self, elites):
+        '''
+        coarse-to-fine heading discretization: every coarse target also gets the fine headings around the approach
+        headings the elites use at the target, then the graphs are widened to the new heading sets
+        '''
+        fine = np.array(self.discrete_heading)
+        for target in self.coarse_targets:
+            approach = elites[:, 4][elites[:, 1] == target]
+            distance = np.abs((fine[:, None] - approach[None, :] + 18) % 36 - 18)
+            near = fine[np.any(distance <= self.coarse_heading_step // 2, axis=1)]  # half way to the next coarse
+            self.target_heading[target] = sorted(set(self.target_heading[target]) | set(near.tolist()))
+        self.coarse_targets = set()
+        start = time.perf_counter()
+        self.widen_cost_graph(max(len(headings) for headings in self.target_heading.values()))
+        self.update_cost_graph(False)
+        self.stats.add('graph', start)
+
+    def padded_heading(self, targets):
+        '''
+        heading set of each target padded to the heading width with its last heading, [target, heading axis]
+        '''
+        return np.array([self.target_heading[target] + self.target_heading[target][-1:] *
+                         (self.heading_width - len(self.target_heading[target])) for target in targets],
+                        dtype=int).reshape((len(targets), self.heading_width))
+
+    def snap_heading(self, population):
+        '''
+        heading genes outside the heading set of their target (e.g. elites of other UAVs) -> nearest heading
+        '''
+        slot = self.target_slot[population[:, 1]]
+        population[:, 4] = self.slot_headings[slot, self.heading_column[slot, population[:, 4]]]
+        return population
+
+    def target_pose(self, targets):
+        pose = np.zeros((len(targets), self.heading_width, 3))
+        pose[..., :2] = np.array([self.targets[target - 1] for target in targets], dtype=float).reshape((-1, 1, 2))
+        pose[..., 2] = self.padded_heading(targets) * 10 * np.pi / 180
+        return pose
+
+    def dubins_length(self, start, end, rmin):
+        if self.dubins_table:
+            return self.dubins_table.length(start, end, rmin)
+        return dubins_shortest_length(start, end, rmin)
+
+    def dubins_graph(self, rmin, source_targets, end_targets):
+        '''
+        Dubins distance from every (target, heading) of source_targets to every (target, heading) of end_targets
+            shape : [source, heading, end, heading]
+        '''
+        source_pose, end_pose = self.target_pose(source_targets), self.target_pose(end_targets)
+        graph = np.zeros((len(source_targets), self.heading_width, len(end_targets), self.heading_width),
+                         dtype=np.float32)
+        for a in range(len(source_targets)):
+            source_point = source_pose[a][:, None, None, :]
+            end_point = np.broadcast_to(end_pose, (self.heading_width,) + end_pose.shape).copy()
+            end_point[..., -1] += np.where(np.all(source_point == end_point, axis=-1), 1e-5, 0)
+            graph[a] = self.dubins_length(source_point, end_point, rmin)
+        return graph
+
+    def compute_graph_block(self, rmin, pre_slot, slot):
+        '''
+        lazy graph: the missing blocks of the (pre_slot, slot) pairs are computed together, all headings at once
+        '''
+        computed = self.graph_computed[rmin]
+        missing = ~computed[pre_slot, slot]
+        if not np.any(missing):
+            return
+        pre_slot, slot = np.unique(np.stack([pre_slot[missing], slot[missing]]), axis=1)
+        source_point = self.target_pose([self.slot_target[s] for s in pre_slot])[:, :, None, :]
+        end_point = np.repeat(self.target_pose([self.slot_target[s] for s in slot])[:, None], self.heading_width,
+                              axis=1)
+        end_point[..., -1] += np.where(np.all(source_point == end_point, axis=-1), 1e-5, 0)
+        self.cost_graph[rmin][pre_slot, :, slot, :] = self.dubins_length(source_point, end_point, rmin)
+        computed[pre_slot, slot] = True
+
+    def complete_cost_graph(self):
+        slot = np.arange(1, len(self.slot_target))
+        pre_slot, slot = np.repeat(slot, len(slot)), np.tile(slot, len(slot))
+        for rmin in self.cost_graph:
+            self.compute_graph_block(rmin, pre_slot, slot)
+
+    def graph_key(self, rmin):
+        return self.graph_cache.key([self.targets[target - 1] for target in self.slot_target[1:]],
+                                    self.padded_heading(self.slot_target[1:]), rmin,
+                                    self.dubins_table.variant() if self.dubins_table else ())
+
+    def load_cost_graph(self, rmin):
+        self.graph_computed[rmin] = np.ones((len(self.slot_target), len(self.slot_target)), dtype=bool)
+        if self.graph_cache:
+            key = self.graph_key(rmin)
+            graph = self.graph_cache.load(key)
+            if graph is not None:
+                return graph
+        graph = np.zeros((len(self.slot_target), self.heading_width, len(self.slot_target), self.heading_width),
+                         dtype=np.float32)
+        if self.lazy_graph:  # computed on demand, an incomplete graph is not cached
+            self.graph_computed[rmin][:] = False
+            return graph
+        graph[1:, :, 1:] = self.dubins_graph(rmin, self.slot_target[1:], self.slot_target[1:])
+        if self.graph_cache:
+            self.graph_cache.save(key, graph)
+        return graph
+
+    def cost_tensor(self):
+        '''
+        every array the evaluation reads, {'departure', 'arrival', Rmin: cost graph}, the shared copy is read only
+        so a lazy graph is completed first
+        '''
+        if self.lazy_graph:
+            self.complete_cost_graph()
+        return {'departure': self.departure_cost, 'arrival': self.arrival_cost, **self.cost_graph}
+
+    def attach_cost_tensor(self, tensor):
+        self.departure_cost, self.arrival_cost = tensor['departure'], tensor['arrival']
+        self.cost_graph = {rmin: graph for rmin, graph in tensor.items() if rmin not in ['departure', 'arrival']}
+        self.cost_matrix = [self.cost_graph[rmin] for rmin in self.uav_Rmin]
+
+    def evaluation_model(self):
+        '''
+        picklable state of the GA without the cost tensor and caches, rebuilt in worker processes with
+        attach_cost_tensor
+        '''
+        local = ['cost_graph', 'cost_matrix', 'departure_cost', 'arrival_cost', 'graph_cache', 'dubins_table',
+                 'fitness_cache', 'evaluated_population', 'evaluated_state', 'islands', 'fitness_pool', 'stats']
+        return {key: value for key, value in self.__dict__.items() if key not in local}
+
+    @classmethod
+    def from_model(cls, model, tensor):
+        '''
+        GA of a worker process, evaluation_model of the main process with an attached cost tensor
+        '''
+        sead_mission = cls.__new__(cls)
+        sead_mission.__dict__.update(model)
+        sead_mission.attach_cost_tensor(tensor)
+        sead_mission.graph_cache, sead_mission.fitness_cache = None, None
+        sead_mission.dubins_table = None  # the workers only evaluate, the graphs come complete with the tensor
+        sead_mission.evaluated_population, sead_mission.evaluated_state = None, None
+        sead_mission.islands, sead_mission.fitness_pool = None, None
+        sead_mission.stats = GAStats()
+        return sead_mission
+
+    def pose_length(self, source_point, end_point, rmin):
+        '''
+        dubins_length of broadcast poses, a pose to itself is a full loop (as in dubins_graph)
+        '''
+        source_point, end_point = np.broadcast_arrays(source_point, end_point)
+        end_point = end_point.copy()
+        end_point[..., -1] += np.where(np.all(source_point == end_point, axis=-1), 1e-5, 0)
+        return self.dubins_length(source_point, end_point, rmin)
+
+    def widen_cost_graph(self, heading_width):
+        '''
+        the heading sets of the slots changed (heading refinement, a wider heading axis): the entries between headings
+        already in the graph move to their new columns, only the entries of the new headings are computed
+        '''
+        slot_num, old_headings = len(self.slot_target), self.slot_headings[:len(self.slot_target)]
+        self.heading_width = heading_width
+        headings = np.zeros((slot_num, heading_width), dtype=int)
+        headings[1:] = self.padded_heading(self.slot_target[1:])
+        # old column of each (slot, heading axis), -1: heading new to the slot
+        same = headings[:, :, None] == old_headings[:, None, :]
+        column = np.where(np.any(same, axis=2), np.argmax(same, axis=2), -1)[1:]
+        fresh = column < 0
+        pose = self.target_pose(self.slot_target[1:])
+        end_slot, end_column = np.nonzero(fresh)
+        for rmin, old_graph in self.cost_graph.items():
+            capacity = old_graph.shape[0]
+            graph = np.zeros((capacity, heading_width, capacity, heading_width), dtype=np.float32)
+            cached = self.graph_cache.load(self.graph_key(rmin)) if self.graph_cache and not self.lazy_graph else None
+            if self.lazy_graph:  # the blocks are computed again on demand
+                self.graph_computed[rmin][:] = False
+            elif cached is not None:
+                graph[:slot_num, :, :slot_num] = cached
+            else:
+                for a in range(slot_num - 1):
+                    rows = np.flatnonzero(~fresh[a])
+                    graph[a + 1, rows, 1:slot_num] = \
+                        old_graph[a + 1][column[a, rows]][:, 1:slot_num][:, np.arange(slot_num - 1)[:, None], column]
+                    graph[a + 1, rows[:, None], end_slot + 1, end_column] = \
+                        self.pose_length(pose[a, rows][:, None], pose[end_slot, end_column][None], rmin)
+                    rows = np.flatnonzero(fresh[a])
+                    graph[a + 1, rows, 1:slot_num] = self.pose_length(pose[a, rows][:, None, None], pose[None], rmin)
+                if self.graph_cache:
+                    self.graph_cache.save(self.graph_key(rmin), graph[:slot_num, :, :slot_num])
+            self.cost_graph[rmin] = graph
+
+    def update_cost_graph(self, build_graph):
+        '''
+        targets are stored in graph slots, so the graph is kept up to date incrementally
+            new target : only the rows and columns of its slot are computed
+            finished target : its slot is compacted out once finished targets fill half of the slots
+        '''
+        if build_graph and not self.incremental_graph:
+            self.cost_graph, self.slot_target = {}, [0]
+        for target in range(1, len(self.targets) + 1):
+            if self.tasks_status[target - 1] and target not in self.target_heading:
+                self.target_heading[target] = self.coarse_heading()
+                if self.coarse_heading_step:
+                    self.coarse_targets.add(target)
+        heading_width = max([len(self.target_heading[target]) for target in self.target_heading] + [1])
+        if heading_width > self.heading_width:  # the heading axis grows
+            self.widen_cost_graph(heading_width)
+        finished_slots = [s for s, target in enumerate(self.slot_target) if s and self.tasks_status[target - 1] == 0]
+        if finished_slots and 2 * len(finished_slots) >= len(self.slot_target) - 1:
+            keep = [s for s in range(len(self.slot_target)) if s not in finished_slots]
+            heading = range(self.heading_width)
+            for rmin, graph in self.cost_graph.items():
+                graph[:len(keep), :, :len(keep)] = graph[np.ix_(keep, heading, keep, heading)]
+                computed = self.graph_computed[rmin]
+                computed[:len(keep), :len(keep)] = computed[np.ix_(keep, keep)]
+            self.slot_target = [self.slot_target[s] for s in keep]
+        new_targets = [target for target in range(1, len(self.targets) + 1)
+                       if self.tasks_status[target - 1] and target not in self.slot_target]
+        slot_num = len(self.slot_target) + len(new_targets)
+        for rmin, graph in self.cost_graph.items():
+            if graph.shape[0] < slot_num:  # grow the capacity of the graph
+                capacity = max(slot_num, round(1.5 * graph.shape[0]))
+                self.cost_graph[rmin] = np.zeros((capacity, self.heading_width, capacity, self.heading_width),
+                                                 dtype=np.float32)
+                self.cost_graph[rmin][:graph.shape[0], :, :graph.shape[0]] = graph
+                computed = np.zeros((capacity, capacity), dtype=bool)
+                computed[:graph.shape[0], :graph.shape[0]] = self.graph_computed[rmin]
+                self.graph_computed[rmin] = computed
+        old_targets, new_slot = self.slot_target[1:], len(self.slot_target)
+        self.slot_target = self.slot_target + new_targets
+        self.target_slot = np.zeros(len(self.targets) + 1, dtype=int)
+        self.target_slot[self.slot_target] = np.arange(slot_num)
+        self.slot_headings = np.zeros((slot_num, self.heading_width), dtype=int)
+        self.slot_headings[1:] = self.padded_heading(self.slot_target[1:])
+        self.slot_heading_num = np.array([1] + [len(self.target_heading[target]) for target in self.slot_target[1:]])
+        distance = np.abs((np.arange(36)[None, :, None] - self.slot_headings[:, None, :] + 18) % 36 - 18)
+        self.heading_column = np.argmin(np.where(np.arange(self.heading_width) < self.slot_heading_num[:, None, None],
+                                                 distance, 36), axis=2)
+        for rmin in set(self.uav_Rmin):
+            if rmin not in self.cost_graph:
+                self.cost_graph[rmin] = self.load_cost_graph(rmin)
+            elif new_targets and self.lazy_graph:
+                self.graph_computed[rmin][new_slot:slot_num] = False
+                self.graph_computed[rmin][:, new_slot:slot_num] = False
+            elif new_targets:
+                self.cost_graph[rmin][new_slot:slot_num, :, 1:slot_num] = \
+                    self.dubins_graph(rmin, new_targets, self.slot_target[1:])
+                self.cost_graph[rmin][1:new_slot, :, new_slot:slot_num] = \
+                    self.dubins_graph(rmin, old_targets, new_targets)
+                self.graph_computed[rmin][new_slot:slot_num] = True
+                self.graph_computed[rmin][:, new_slot:slot_num] = True
+        self.cost_graph = {rmin: graph for rmin, graph in self.cost_graph.items() if rmin in self.uav_Rmin}
+        self.graph_computed = {rmin: self.graph_computed[rmin] for rmin in self.cost_graph}
+        self.cost_matrix = [self.cost_graph[rmin] for rmin in self.uav_Rmin]
+        self.uav_graph_class = np.array([list(self.cost_graph).index(rmin) for rmin in self.uav_Rmin])
+        self.cost_version += 1
+        # update real time information in graph
+        target_pose = self.target_pose(self.slot_target[1:])
+        self.departure_cost = np.zeros((len(self.uav_id), slot_num, self.heading_width), dtype=np.float32)
+        self.arrival_cost = np.zeros_like(self.departure_cost)
+        for u in range(len(self.uav_id)):
+            self.departure_cost[u, 1:] = self.dubins_length(self.uav_position[u], target_pose, self.uav_Rmin[u])
+            self.arrival_cost[u, 1:] = self.dubins_length(target_pose, self.depots[u], self.uav_Rmin[u])
+            self.departure_cost[u, 0, 0] = self.arrival_cost[u, 0, 0] = \
+                dubins_shortest_length(self.uav_position[u], self.depots[u], self.uav_Rmin[u])
+
+    def mission_changes(self, information):
+        '''
+        the uav message finishes tasks, adds targets or changes the UAV set, i.e. more than a position update
+        '''
+        return any(self.tasks_status[target - 1] == 4 - task_type for target, task_type in information[8]) or \
+            any(target not in self.targets for target in information[9]) or set(self.uav_id) != set(information[0])
 
     def information_setting(self, information, population):
         lost_agent, build_graph = False, False
@@ -307,7 +971,6 @@ class GA_SEAD(object):
                     new_task.append(self.targets.index(target)+1)
             build_graph = True
         if not set(self.uav_id) == set(information[0]):  # check agents
-            build_graph = True
             lost_agent = True
         # clear the information
         self.uav_id = information[0]
@@ -330,53 +993,43 @@ class GA_SEAD(object):
             elif agent == 3:  # munition
                 self.uavType_for_missions[1].append(self.uav_id[i])
         # cost graph --------------------------------------------------------------------------------------------
-        if build_graph:
-            self.cost_matrix = [[[[[0 for a in range(len(self.discrete_heading))] for b in range(len(self.targets) + 1)]
-                                  for c in range(len(self.discrete_heading))] for d in range(len(self.targets) + 1)]
-                                for u in range(len(self.uav_id))]
-            for a in range(1, len(self.targets) + 1):
-                for b in self.discrete_heading:
-                    for c in range(1, len(self.targets) + 1):
-                        for d in self.discrete_heading:
-                            source_point = self.targets[a - 1] + [b * 10 * np.pi / 180]
-                            end_point = self.targets[c - 1] + [d * 10 * np.pi / 180]
-                            if source_point == end_point:
-                                end_point[-1] += 1e-5
-                            for u in range(len(self.uav_id)):
-                                distance = dubins.shortest_path(source_point, end_point, self.uav_Rmin[u]).path_length()
-                                self.cost_matrix[u][a][b][c][d] = distance
-        # update real time information in graph
-        for a in range(1, len(self.targets) + 1):
-            for b in self.discrete_heading:
-                point = self.targets[a - 1] + [b * 10 * np.pi / 180]
-                for u in range(len(self.uav_id)):
-                    distance = dubins.shortest_path(self.uav_position[u], point, self.uav_Rmin[u]).path_length()
-                    self.cost_matrix[u][0][0][a][b] = distance
-                    distance = dubins.shortest_path(point, self.depots[u], self.uav_Rmin[u]).path_length()
-                    self.cost_matrix[u][a][b][0][0] = distance
-        for u in range(len(self.uav_id)):
-            distance = dubins.shortest_path(self.uav_position[u], self.depots[u], self.uav_Rmin[u]).path_length()
-            self.cost_matrix[u][0][0][0][0] = distance
+        start = time.perf_counter()
+        self.update_cost_graph(build_graph)
+        self.stats.add('graph', start)
 
         # ga parameters
-        self.population_size = round(self.initial_population_size / len(self.uav_id))
-        self.crossover_num = round((self.population_size - self.elitism_num) * 0.67)
-        self.mutation_num = self.population_size - self.crossover_num - self.elitism_num
+        self.set_population_size(round(self.initial_population_size / len(self.uav_id)))
         self.lambda_1 = 1 / (sum(self.uav_velocity))
 
         # precomputed matrix
+        self.uav_index = np.full(max(self.uav_id) + 1, -1)
+        self.uav_index[self.uav_id] = np.arange(len(self.uav_id))
+        self.uav_velocity_array = np.array(self.uav_velocity, dtype=float)
         self.remaining_targets = [target_id for target_id in range(1, len(self.targets) + 1) if
                                   not self.tasks_status[target_id - 1] == 0]
         self.task_amount_array = [np.count_nonzero(np.array(self.tasks_status) >= 3 - t) for t in range(3)]
-        self.task_index_array = [0, self.task_amount_array[0], self.task_amount_array[0] + self.task_amount_array[1]]
-        self.target_sequence = [[index for (index, value) in enumerate(self.tasks_status) if value == task_num]
-                                for task_num in range(1, 4)]
-        self.target_index_array = [0]
-        for k, times in enumerate(self.tasks_status):
-            self.target_index_array.append(self.target_index_array[k] + times)
+        # bundle position, target and rank in its target of each task, [target-based gene]
+        self.task_position = np.zeros((len(self.targets) + 1, 4), dtype=int)
+        task_target, task_type_list, self.task_rank = [], [], []
+        for target, task_num in enumerate(self.tasks_status, 1):
+            for rank, task_type in enumerate(range(4 - task_num, 4)):
+                self.task_position[target][task_type] = len(task_target)
+                task_target.append(target)
+                task_type_list.append(task_type)
+                self.task_rank.append(rank)
+        self.task_rank = np.array(self.task_rank, dtype=int)
+        self.task_target = np.array(task_target, dtype=int)
+        self.task_type = np.array(task_type_list, dtype=int)
+        self.task_target_index = np.searchsorted(self.remaining_targets, task_target)
+        self.capable_num = np.array([len(uavs) for uavs in self.uavType_for_missions])
+        self.capable_uav = np.zeros((3, max(1, max(self.capable_num))), dtype=int)
+        for task_type, uavs in enumerate(self.uavType_for_missions):
+            self.capable_uav[task_type][:len(uavs)] = uavs
 
         # modify population
-        if population:
+        if self.unassigned_task_types():  # no solution
+            return None
+        if population is not None and len(population):
             information[7] = [elite for elite in information[7] if elite]
             # tasks finished
             for elite in information[7]:
@@ -404,17 +1057,17 @@ class GA_SEAD(object):
                             elite[1].insert(point, target)
                             elite[2].insert(point, task_type)
                             elite[3].insert(point, random.choice(self.uavType_for_missions[task_type-1]))
-                            elite[4].insert(point, random.choice(self.discrete_heading))
+                            elite[4].insert(point, random.choice(self.target_heading[target]))
                             task_type += 1
                     elite[0] = [sequence for sequence in range(1, len(elite[1]) + 1)]
             # regenerate population
             if new_target or clear_task or lost_agent:
-                try:
-                    population = self.generate_population()
-                except IndexError: # no solution
-                    return [], 1e-5, None
+                population = self.repair_population(population, clear_task, new_task)
             # population incorporation
-            population.extend([elite for elite in information[7] if len(elite[0]) == sum(self.tasks_status)])
+            elites = [elite for elite in information[7] if len(elite[0]) == sum(self.tasks_status)]
+            if elites:
+                population = np.concatenate([population, np.array(elites, dtype=population.dtype)])
+                population = self.snap_heading(population)
         return population
 
     def run_GA(self, iteration, uav_message, population=None):
@@ -427,28 +1080,26 @@ class GA_SEAD(object):
             self.crossover_prob = [0, 1] if residual_tasks <= 1 else [0.5, 0.5]
             empty = False
         if not empty:
-            if not population:
+            if population is None or not len(population):
                 population = self.generate_population()
                 iteration -= 1
             fitness, wheel = self.fitness_evaluate(population)
             a.append(1/max(fitness))
             for iterate in range(iteration):
-                new_population = []
-                new_population.extend(self.elitism_operator(fitness, population))
-                new_population.extend(self.crossover_operator(wheel, population))
-                new_population.extend(self.mutation_operator(wheel, population))
+                new_population = self.next_generation(fitness, wheel, population)
                 fitness, wheel = self.fitness_evaluate(new_population)
                 population = new_population
                 a.append(1/max(fitness))
-            return population[fitness.index(max(fitness))], max(fitness), population, a
+            return population[np.argmax(fitness)].tolist(), max(fitness), population, a
         else:
             return [[] for _ in range(5)], 0, [], 0
 
     def run_GA_time_period_version(self, time_interval, uav_message, population=None, update=True):
-        iteration = 0
         start_time = time.time()
+        self.stats = GAStats(self.fitness_cache)
         if update:
             population = self.information_setting(uav_message, population)
+            self.stats.add('setting', self.stats.start)
         residual_tasks = sum(self.tasks_status)
         if residual_tasks == 0:
             empty = True
@@ -456,25 +1107,49 @@ class GA_SEAD(object):
             self.crossover_prob = [0, 1] if residual_tasks <= 1 else [0.5, 0.5]
             empty = False
         if not empty:
-            if not population:
-                try:
-                    population = self.generate_population()
-                except IndexError: # no solution
+            if population is None or not len(population):
+                if self.unassigned_task_types():  # no solution
+                    self.stats.finish()
                     return [], 1e-5, None
-            fitness, wheel = self.fitness_evaluate(population)
-            while time.time() - start_time <= time_interval:
-                iteration += 1
-                new_population = []
-                new_population.extend(self.elitism_operator(fitness, population))
-                new_population.extend(self.crossover_operator(wheel, population))
-                new_population.extend(self.mutation_operator(wheel, population))
-                fitness, wheel = self.fitness_evaluate(new_population)
-                population = new_population
-            return population[fitness.index(max(fitness))], max(fitness), population
+                population = self.generate_population()
+            if self.auction_seed and update:
+                population = np.concatenate([population, sequential_auction(self)[None]])
+            if self.coarse_targets:  # coarse headings first, then the fine headings around the elites
+                population, fitness = self.evolve(population, start_time + self.coarse_fraction * time_interval)
+                self.refine_heading(self.elitism_operator(fitness, population))
+            population, fitness = self.evolve(population, start_time + time_interval)
+            self.stats.finish()
+            return population[np.argmax(fitness)].tolist(), max(fitness), population
         else:
             residual_fitness, _, _, _ = self.chromosome_objectives_evaluate([[] for _ in range(5)])
+            self.stats.finish()
             return [[] for _ in range(5)], residual_fitness, []
 
+    def run_auction(self, uav_message, population=None, update=True):
+        '''
+        low-latency allocation by sequential auction (auction.py), the same return as run_GA_time_period_version,
+        the population is seeded with the auction solution so that the GA can go on from it
+        '''
+        self.stats = GAStats(self.fitness_cache)
+        if update:
+            population = self.information_setting(uav_message, population)
+            self.stats.add('setting', self.stats.start)
+        if sum(self.tasks_status) == 0:
+            residual_fitness, _, _, _ = self.chromosome_objectives_evaluate([[] for _ in range(5)])
+            self.stats.finish()
+            return [[] for _ in range(5)], residual_fitness, []
+        if self.unassigned_task_types():  # no solution
+            self.stats.finish()
+            return [], 1e-5, None
+        chromosome = sequential_auction(self)
+        if population is None or not len(population):
+            population = self.generate_population()
+        population = np.concatenate([population, chromosome[None]])
+        fitness, _ = self.fitness_evaluate(population[-1:])
+        self.stats.generation(fitness[0], 0)
+        self.stats.finish()
+        return population[-1].tolist(), fitness[0], population
+
     def run_RS(self, iteration, uav_message, population=None):
         a = []
         population = self.generate_population()
@@ -489,58 +1164,51 @@ class GA_SEAD(object):
                     fitness[fitness.index(min(fitness))] = new_fitness[i]
                     population[i] = chromosome
             a.append(1/max(fitness))
-        return population[fitness.index(max(fitness))], max(fitness), population, a
-
-    def plot_result(self, best_solution, curve=None):
-        def dubins_plot(state_list, c, time_):
-            distance = 0
-            route_ = [[] for _ in range(2)]
-            arrow_ = []
-            for a in range(1, len(state_list)-1):
-                state_list[a][2] *= np.pi / 180
-            for a in range(len(state_list) - 1):
-                sp = state_list[a]
-                gp = state_list[a + 1] if state_list[a] != state_list[a + 1] \
-                    else [state_list[a + 1][0], state_list[a + 1][1], state_list[a + 1][2] - 1e-5]
-                dubins_path = dubins.shortest_path(sp, gp, self.uav_Rmin[c])
-                path, _ = dubins_path.sample_many(.1)
-                route_[0].extend([b[0] for b in path])
-                route_[1].extend([b[1] for b in path])
-                distance += dubins_path.path_length()
-                try:
-                    time_[a].append(distance / self.uav_velocity[c])
-                except IndexError:
-                    pass
-            arrow_.extend(
-                [[route_[0][arr], route_[1][arr], route_[0][arr + 100], route_[1][arr + 100]]
-                 for arr in range(0, len(route_[0]), 15000)])
-            print(state_list)
-            return distance, route_, arrow_
+        return population[fitness.index(max(fitness))].tolist(), max(fitness), population, a
+
+    def solution_routes(self, best_solution, tolerance=1.0):
+        '''
+        flight routes of a solution, the Dubins paths are sampled by dubins_sample within tolerance (m)
+            return : per UAV [distance, points (point, 3) of (x, y, heading), tasks [[target, task type, arrival time]]]
+        '''
+        routes = []
+        for j in range(len(self.uav_id)):
+            genes = [g for g in range(len(best_solution[0])) if best_solution[3][g] == self.uav_id[j]]
+            states = np.array([self.uav_position[j]] +
+                              [[self.targets[best_solution[1][g] - 1][0], self.targets[best_solution[1][g] - 1][1],
+                                best_solution[4][g] * 10 * np.pi / 180] for g in genes] + [self.depots[j]], dtype=float)
+            start, end = states[:-1], states[1:].copy()
+            end[np.all(start == end, axis=1), 2] -= 1e-5  # the same site twice in a row: a full loop
+            points, leg = dubins_sample(start, end, self.uav_Rmin[j], tolerance)
+            arrival_time = np.cumsum(leg) / self.uav_velocity[j]
+            routes.append([np.sum(leg), points, [[best_solution[1][g], best_solution[2][g], arrival_time[a]]
+                                                 for a, g in enumerate(genes)]])
+        return routes
 
+    def plot_result(self, best_solution, curve=None, output=None, route_output=None, show=None, dpi=150,
+                    figsize=(6.4, 4.8)):
+        '''
+        routes of a solution
+            output : image path (.png, .svg, ...) rendered headless without pyplot, route_output : JSON path of routes
+            show : pyplot window, by default only when nothing is written
+        the turns are sampled within half a pixel of the route axes, the straight segments by their end points
+        '''
         print(f'best gene:{best_solution}')
+        if show is None:
+            show = output is None and route_output is None
+        sites = np.array([p[:2] for p in self.uav_position] + [p[:2] for p in self.depots] + self.targets, dtype=float)
+        extent = np.max(np.ptp(sites, axis=0)) + 4 * max(self.uav_Rmin)
+        pixels = figsize[0] * dpi / (2 if curve else 1)
+        tolerance = max(extent / pixels / 2, 1e-3)
+        routes = self.solution_routes(best_solution, tolerance)
         uav_num = len(self.uav_id)
-        dist = np.zeros(uav_num)
-        task_sequence_state = [[] for _ in range(uav_num)]
-        task_route = [[] for _ in range(uav_num)]
-        route_state = [[] for _ in range(uav_num)]
-        arrow_state = [[] for _ in range(uav_num)]
-        for j in range(len(best_solution[0])):
-            assign_uav = self.uav_id.index(best_solution[3][j])
-            assign_target = best_solution[1][j]
-            assign_heading = best_solution[4][j] * 10
-            task_sequence_state[assign_uav].append([
-                self.targets[assign_target - 1][0], self.targets[assign_target - 1][1],
-                assign_heading])
-            task_route[assign_uav].extend([[assign_target, best_solution[2][j]]])
-        for j in range(uav_num):
-            task_sequence_state[j] = [self.uav_position[j]] + task_sequence_state[j] + [self.depots[j]]
-            dist[j], route_state[j], arrow_state[j] = dubins_plot(task_sequence_state[j], j, task_route[j])
-        for route in task_route:
-            print(f'best route:{route}')
+        dist = np.array([route[0] for route in routes])
+        for route in routes:
+            print(f'best route:{[task[:2] for task in route[2]]}')
         # arrange to target-based to check time sequence constraints
         time_list = []
-        for time_sequence in task_route:
-            time_list.extend(time_sequence)
+        for route in routes:
+            time_list.extend(route[2])
         time_list.sort()
         print(time_list)
         penalty, j = 0, 0
@@ -555,45 +1223,59 @@ class GA_SEAD(object):
         print(f'penalty: {penalty}')
         print(1/self.fitness_evaluate_calculate([best_solution])[0][0])
         print(1 / self.fitness_evaluate([best_solution])[0][0])
+        if route_output:
+            with open(route_output, 'w') as f:
+                json.dump({'tolerance': tolerance, 'penalty': penalty,
+                           'uavs': [{'id': int(self.uav_id[i]), 'distance': float(routes[i][0]),
+                                     'mission_time': float(routes[i][0] / self.uav_velocity[i]),
+                                     'tasks': [[int(t[0]), int(t[1]), float(t[2])] for t in routes[i][2]],
+                                     'route': np.round(routes[i][1][:, :2], 2).tolist()} for i in range(uav_num)]}, f)
+        if not (output or show):
+            return routes
         color_style = ['tab:blue', 'tab:green', 'tab:orange', '#DC143C', '#808080', '#030764', '#06C2AC', '#008080',
                        '#DAA520', '#580F41', '#7BC8F6', '#C875C4']
         font = {'family': 'Times New Roman', 'weight': 'normal', 'size': 8}
         font0 = {'family': 'Times New Roman', 'weight': 'normal', 'size': 10}
         font1 = {'family': 'Times New Roman', 'weight': 'normal', 'color': 'm', 'size': 8}
         font2 = {'family': 'Times New Roman', 'weight': 'normal', 'color': 'r', 'size': 8}
+        # headless figures do not touch the pyplot state or the display
+        fig = plt.figure(figsize=figsize, dpi=dpi) if show else Figure(figsize=figsize, dpi=dpi)
         if curve:
-            plt.subplot(122)
-            plt.plot([b for b in range(1, len(curve) + 1)], curve, '-')
-            print(len(curve))
-            plt.grid()
-            # plt.ylabel('E ( $\mathregular{J_i}$ / $\mathregular{J_1}$ )', fontsize=12)
-            plt.subplot(121)
+            ax_curve = fig.add_subplot(122)
+            ax_curve.plot([b for b in range(1, len(curve) + 1)], curve, '-')
+            ax_curve.grid()
+            ax = fig.add_subplot(121)
         else:
-            fig, ax = plt.subplots()
+            ax = fig.add_subplot(111)
             labels = ax.get_xticklabels() + ax.get_yticklabels()
             [label.set_fontname('Times New Roman') for label in labels]
         for i in range(uav_num):
-            plt.plot(route_state[i][0], route_state[i][1], '-', linewidth=0.8, color=color_style[i], label=f'UAV {self.uav_id[i]}')
-            plt.text(self.uav_position[i][0]-100, self.uav_position[i][1]-200, f'UAV {self.uav_id[i]}', font)
-            plt.axis("equal")
-            for arrow in arrow_state[i]:
-                plt.arrow(arrow[0], arrow[1], arrow[2] - arrow[0], arrow[3] - arrow[1], width=16, color=color_style[i])
-        plt.plot([x[0] for x in self.uav_position], [x[1] for x in self.uav_position], 'k^', markerfacecolor='none', markersize=8)
-        # i = 1
-        # for pos in self.uav_position:
-        #     plt.plot(pos[0], pos[1], '^', color=color_style[i-1], markerfacecolor='none', markersize=8, label=f'UAV {i}')
-        #     i += 1
-        plt.plot([b[0] for b in self.targets], [b[1] for b in self.targets], 'ms', label='Target position',
-                 markerfacecolor='none', markersize=6)
-        plt.plot(self.depots[0][0], self.depots[0][1], 'r*', markerfacecolor='none', markersize=10, label='Base')
-        for t in self.targets:
-            plt.text(t[0]+100, t[1]+100, f'Target {self.targets.index(t)+1}', font1)
-        plt.text(self.depots[0][0]-100, self.depots[0][1]-200, 'Base', font2)
-        plt.legend(loc='upper right', prop=font)
-        plt.xlabel('East, m', font0)
-        plt.ylabel('North, m', font0)
-        # plt.grid()
-        plt.show()
+            points = routes[i][1]
+            color = color_style[i % len(color_style)]
+            ax.plot(points[:, 0], points[:, 1], '-', linewidth=0.8, color=color, label=f'UAV {self.uav_id[i]}')
+            ax.text(self.uav_position[i][0]-100, self.uav_position[i][1]-200, f'UAV {self.uav_id[i]}', font)
+            # heading arrows every 1500 m of the route
+            flown = np.concatenate([[0], np.cumsum(np.hypot(*np.diff(points[:, :2], axis=0).T))])
+            for arr in np.searchsorted(flown, np.arange(0, flown[-1], 1500)):
+                ax.arrow(points[arr, 0], points[arr, 1], 10 * np.cos(points[arr, 2]), 10 * np.sin(points[arr, 2]),
+                         width=16, color=color)
+        ax.axis("equal")
+        ax.plot([x[0] for x in self.uav_position], [x[1] for x in self.uav_position], 'k^', markerfacecolor='none',
+                markersize=8)
+        ax.plot([b[0] for b in self.targets], [b[1] for b in self.targets], 'ms', label='Target position',
+                markerfacecolor='none', markersize=6)
+        ax.plot(self.depots[0][0], self.depots[0][1], 'r*', markerfacecolor='none', markersize=10, label='Base')
+        for i, t in enumerate(self.targets):
+            ax.text(t[0]+100, t[1]+100, f'Target {i+1}', font1)
+        ax.text(self.depots[0][0]-100, self.depots[0][1]-200, 'Base', font2)
+        ax.legend(loc='upper right', prop=font)
+        ax.set_xlabel('East, m', fontdict=font0)
+        ax.set_ylabel('North, m', fontdict=font0)
+        if output:
+            fig.savefig(output, dpi=dpi)
+        if show:
+            plt.show()
+        return routes
 
 
 if __name__ == "__main__":
@@ -0,0 +1,71 @@
+import numpy as np
+
+
+def auction_bids(sead_mission, uav, target, state):
+    '''
+    bid of each UAV on the next task of each target (pairs of the same shape), appended to the end of its route
+        bid : mission time of the UAV route if the task ended it (back to the depot) + lambda_1 * extra distance
+              + lambda_2 * lateness after the former task of the target
+        return : best bid over the heading set of the target and its heading axis
+    '''
+    distance, last_slot, last_column, previous_time, next_type, capable = state
+    heading_num = sead_mission.heading_width
+    shape = uav.shape + (heading_num,)
+    uav_grid = np.broadcast_to(uav[..., None], shape)
+    slot = np.broadcast_to(sead_mission.target_slot[target][..., None], shape)
+    column = np.broadcast_to(np.arange(heading_num), shape)
+    leg = sead_mission.leg_cost(uav_grid.ravel(), np.broadcast_to(last_slot[uav][..., None], shape).ravel(),
+                                np.broadcast_to(last_column[uav][..., None], shape).ravel(), slot.ravel(),
+                                column.ravel()).reshape(shape)
+    velocity = sead_mission.uav_velocity_array[uav][..., None]
+    back = sead_mission.arrival_cost[uav_grid, slot, column]
+    arrival_time = (distance[uav][..., None] + leg) / velocity
+    extra = leg + back - sead_mission.arrival_cost[uav, last_slot[uav], last_column[uav]][..., None]
+    bid = (distance[uav][..., None] + leg + back) / velocity + sead_mission.lambda_1 * extra + \
+        sead_mission.lambda_2 * np.maximum(0, previous_time[target][..., None] - arrival_time)
+    bid[column >= sead_mission.slot_heading_num[slot]] = np.inf  # padded heading axis
+    task_type = np.minimum(next_type[target], 3) - 1
+    bid[~capable[uav, task_type] | (next_type[target] > 3)] = np.inf
+    best = np.argmin(bid, axis=-1)
+    return np.take_along_axis(bid, best[..., None], axis=-1)[..., 0], best, arrival_time
+
+
+def sequential_auction(sead_mission):
+    '''
+    greedy sequential auction over the cost graph: every round each capable UAV bids on the next task type of every
+    target, the lowest bid wins and the task is appended to the route of the winner, only the bids of the winner
+    and of the auctioned target change for the next round
+        return : feasible order-based chromosome [5, gene] after information_setting
+    '''
+    unassigned = sead_mission.unassigned_task_types()
+    if unassigned:
+        raise ValueError(f'no capable UAV for the task types {unassigned}')
+    targets = np.array(sead_mission.remaining_targets, dtype=int)
+    uav_num, target_num = len(sead_mission.uav_id), len(targets)
+    capable = np.zeros((uav_num, 3), dtype=bool)
+    for task_type, uavs in enumerate(sead_mission.uavType_for_missions):
+        capable[sead_mission.uav_index[uavs], task_type] = True
+    next_type = np.zeros(len(sead_mission.targets) + 1, dtype=int)
+    next_type[targets] = 4 - np.array(sead_mission.tasks_status)[targets - 1]
+    state = (np.zeros(uav_num), np.zeros(uav_num, dtype=int), np.zeros(uav_num, dtype=int),
+             np.zeros(len(sead_mission.targets) + 1), next_type, capable)
+    distance, last_slot, last_column, previous_time = state[:4]
+    uav_grid, target_grid = np.meshgrid(np.arange(uav_num), targets, indexing='ij')
+    bid, column, arrival_time = auction_bids(sead_mission, uav_grid, target_grid, state)
+    chromosome = np.zeros((5, sum(sead_mission.tasks_status)), dtype=sead_mission.gene_dtype)
+    for gene in range(chromosome.shape[1]):
+        u, k = np.unravel_index(np.argmin(bid), bid.shape)
+        target, slot = targets[k], sead_mission.target_slot[targets[k]]
+        chromosome[:, gene] = [gene + 1, target, next_type[target], sead_mission.uav_id[u],
+                               sead_mission.slot_headings[slot, column[u, k]]]
+        leg = sead_mission.leg_cost(np.array([u]), last_slot[[u]], last_column[[u]], np.array([slot]),
+                                    column[[u], [k]])[0]
+        distance[u] += leg
+        last_slot[u], last_column[u] = slot, column[u, k]
+        previous_time[target] = arrival_time[u, k, column[u, k]]
+        next_type[target] += 1
+        # the route of the winner and the next task of the target changed
+        bid[u], column[u], arrival_time[u] = auction_bids(sead_mission, np.full(target_num, u), targets, state)
+        bid[:, k], column[:, k], arrival_time[:, k] = auction_bids(sead_mission, np.arange(uav_num),
+                                                                   np.full(uav_num, target), state)
+    return chromosome
@@ -0,0 +1,136 @@
+'''
+offline microbenchmarks of the GA_SEAD hot paths with fixed seeds, the results are written as JSON to compare releases
+    python benchmark.py --scenarios 4 7 13 50 100 --repeat 5 --output benchmark.json
+'''
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+import contextlib
+import platform
+import numpy as np
+from GA_SEAD_process import GA_SEAD
+
+targets_sites = [[3100, 2200], [500, 3700], [2300, 2500], [2000, 3900], [4450, 3600], [4630, 4780], [1400, 4500],
+                 [3300, 3415], [1640, 1700], [4230, 1700], [500, 2200], [3000, 4500], [5000, 2810]]
+uavs = [[i for i in range(1, 12)], [1, 2, 3, 1, 3, 2, 1, 2, 3, 1, 2],
+        [70, 80, 90, 60, 100, 80, 75, 90, 85, 70, 65],
+        [200, 250, 300, 180, 300, 260, 225, 295, 250, 200, 170],
+        [[1000, 300, -np.pi], [1500, 700, np.pi / 2], [3000, 0, np.pi / 3], [1800, 400, -20 * np.pi / 180],
+         [2200, 280, 45 * np.pi / 180], [4740, 300, 140 * np.pi / 180], [4000, 100, 70 * np.pi / 180],
+         [3500, 450, -75 * np.pi / 180], [5000, 900, -115 * np.pi / 180], [2780, 500, -55 * np.pi / 180],
+         [4000, 600, 85 * np.pi / 180]],
+        [[0, 0, -np.pi / 2] for _ in range(11)]]
+# name: target number, uav number, population size, synthetic targets
+scenarios = {'4': (4, 3, 100, False), '7': (7, 11, 100, False), '13': (13, 11, 300, False),
+             '50': (50, 11, 300, True), '100': (100, 11, 300, True)}
+
+
+def scenario_message(name, seed=0):
+    '''
+    targets and uav message of the scenario, the synthetic targets are uniform on the 5 km x 5 km area of the
+    built-in targets
+    '''
+    target_num, uav_num, pop, synthetic = scenarios[name]
+    if synthetic:
+        targets = np.random.RandomState(seed).randint(0, 5001, (target_num, 2)).tolist()
+    else:
+        targets = copy.deepcopy(targets_sites[:target_num])
+    return targets, [[row[j] for j in range(uav_num)] for row in copy.deepcopy(uavs)] + [[], [], [], []], pop
+
+
+def timed(function, repeat, setup=None):
+    '''
+    run function repeat times, setup (untimed) before each run
+        return : timing in ms and the result of the last run
+    '''
+    elapsed, result = [], None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = function()
+        elapsed.append((time.perf_counter() - start) * 1e3)
+    return {'min_ms': min(elapsed), 'median_ms': float(np.median(elapsed)), 'mean_ms': float(np.mean(elapsed)),
+            'repeat': repeat}, result
+
+
+def benchmark_scenario(name, repeat, cold_repeat=1, seed=0, configure=None):
+    '''
+    time the hot paths on one scenario, the fitness cache is cleared before every timed run so that the evaluation
+    is measured instead of the cache, the cold information_setting builds the whole cost graph and is repeated
+    cold_repeat times only
+    '''
+    random.seed(seed)
+    np.random.seed(seed)
+    targets, message, pop = scenario_message(name, seed)
+    results = {}
+
+    def cold_setting():
+        sead_mission = GA_SEAD(copy.deepcopy(targets), pop)
+        if configure:
+            configure(sead_mission)
+        sead_mission.information_setting(copy.deepcopy(message), None)
+        return sead_mission
+    results['information_setting_cold'], sead_mission = timed(cold_setting, cold_repeat)
+    clear_cache = sead_mission.fitness_cache.entries.clear
+    results['generate_population'], population = timed(sead_mission.generate_population, repeat)
+    results['information_setting_warm'], _ = timed(
+        lambda: sead_mission.information_setting(copy.deepcopy(message), population), repeat)
+    results['fitness_evaluate'], (fitness, wheel) = timed(lambda: sead_mission.fitness_evaluate(population), repeat,
+                                                          clear_cache)
+    results['crossover_operator'], _ = timed(lambda: sead_mission.crossover_operator(wheel, population), repeat)
+
+    def mutation_setup():  # with delta_evaluation, the children are evaluated against the evaluated parents
+        clear_cache()
+        sead_mission.fitness_evaluate(population)
+    results['mutation_operator'], _ = timed(lambda: sead_mission.mutation_operator(wheel, population), repeat,
+                                            mutation_setup)
+
+    def generation():  # one generation of the run_GA_time_period_version loop
+        new_population = sead_mission.next_generation(fitness, wheel, population)
+        return sead_mission.fitness_evaluate(new_population)
+    results['generation'], _ = timed(generation, repeat, mutation_setup)
+    return {'targets': len(targets), 'uavs': len(message[0]), 'population': len(population),
+            'genes': population.shape[2], 'heading_width': sead_mission.heading_width,
+            'cost_graph_memory': sead_mission.cost_matrix_memory(),
+            'cost_graph_estimate': GA_SEAD.cost_matrix_nbytes(len(set(message[3])), len(message[0]), len(targets),
+                                                              sead_mission.heading_width), 'results': results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='GA_SEAD microbenchmarks')
+    parser.add_argument('--scenarios', nargs='+', default=list(scenarios), choices=list(scenarios))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cold-repeat', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--lazy-graph', action='store_true', help='compute the cost graph blocks on first use')
+    parser.add_argument('--coarse-heading-step', type=int, default=None)
+    parser.add_argument('--delta-evaluation', action='store_true', help='evaluate the mutants from their parents')
+    parser.add_argument('--output', default=None, help='JSON file, stdout by default')
+    args = parser.parse_args(argv)
+
+    def configure(sead_mission):
+        sead_mission.lazy_graph = args.lazy_graph
+        sead_mission.coarse_heading_step = args.coarse_heading_step
+        sead_mission.delta_evaluation = args.delta_evaluation
+    report = {'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+              'repeat': args.repeat, 'cold_repeat': args.cold_repeat, 'seed': args.seed, 'lazy_graph': args.lazy_graph,
+              'coarse_heading_step': args.coarse_heading_step, 'delta_evaluation': args.delta_evaluation,
+              'scenarios': {}}
+    with contextlib.redirect_stdout(sys.stderr):  # keep the planner prints out of the JSON
+        for name in args.scenarios:
+            report['scenarios'][name] = benchmark_scenario(name, args.repeat, args.cold_repeat, args.seed,
+                                                              configure)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,116 @@
+'''
+optional numba kernels of the GA hot paths, GA_SEAD falls back to its NumPy path when numba is not installed
+    route_scan : per-UAV segmented scan of the leg costs (fitness)
+    sequence_penalty : time sequence penalty of the tasks of each target (fitness)
+    scatter_genes : order-based <-> target-based permutation of the crossover and mutation operators
+the random draws of the operators stay in NumPy, so both backends consume the same random stream
+compiled kernels are cached on disk (__pycache__, or NUMBA_CACHE_DIR when the package is read-only)
+    python compiled_kernels.py : parity check of the kernels against the NumPy path
+'''
+import numpy as np
+try:
+    import numba
+except ImportError:
+    numba = None
+
+available = numba is not None
+
+
+def njit(function):
+    return numba.njit(cache=True, nogil=True)(function) if numba else function
+
+
+@njit
+def route_scan(order, uav, slot, heading, leg, first, velocity, arrival_cost):
+    '''
+    routes of uav_routes, leg cost of each route position
+        return : flight distance of each UAV back to its depot [chromosome, uav], arrival time [chromosome, gene]
+    '''
+    chromosome_num, gene_num = uav.shape
+    uav_num = arrival_cost.shape[0]
+    cost = np.empty((chromosome_num, uav_num))
+    arrival_time = np.zeros((chromosome_num, gene_num))
+    for c in range(chromosome_num):
+        for u in range(uav_num):
+            cost[c, u] = arrival_cost[u, 0, 0]
+        distance = 0.0
+        for j in range(gene_num):
+            if first[c, j]:
+                distance = 0.0
+            distance += leg[c, j]
+            u = uav[c, j]
+            arrival_time[c, order[c, j]] = distance / velocity[u]
+            if j == gene_num - 1 or uav[c, j + 1] != u:
+                cost[c, u] = distance + arrival_cost[u, slot[c, j], heading[c, j]]
+    return cost, arrival_time
+
+
+@njit
+def sequence_penalty(target, task_type, arrival_time, status):
+    '''
+    lateness of each task after the next task type of its target, status: tasks status with target 0 in front
+    '''
+    chromosome_num, gene_num = target.shape
+    penalty = np.zeros(chromosome_num)
+    time_table = np.zeros((status.shape[0], 4))
+    for c in range(chromosome_num):
+        for j in range(gene_num):
+            time_table[target[c, j], task_type[c, j]] = arrival_time[c, j]
+        for j in range(gene_num):
+            t = target[c, j]
+            if task_type[c, j] == 2:
+                if status[t] >= 3:
+                    penalty[c] += max(0.0, time_table[t, 1] - time_table[t, 2])
+                if status[t] >= 2:
+                    penalty[c] += max(0.0, time_table[t, 2] - time_table[t, 3])
+        for j in range(gene_num):
+            time_table[target[c, j], task_type[c, j]] = 0.0
+    return penalty
+
+
+@njit
+def scatter_genes(population, destination):
+    '''
+    gene j of each chromosome moved to gene destination[chromosome, j]
+    '''
+    chromosome_num, row_num, gene_num = population.shape
+    scattered = np.empty_like(population)
+    for c in range(chromosome_num):
+        for j in range(gene_num):
+            for row in range(row_num):
+                scattered[c, row, destination[c, j]] = population[c, row, j]
+    return scattered
+
+
+if __name__ == "__main__":
+    import sys
+    import random
+    from GA_SEAD_process import GA_SEAD
+    from benchmark import scenario_message
+    if not available:
+        sys.exit('numba is not installed, only the NumPy path is available')
+    failed = False
+    for name in ['4', '7', '13']:
+        random.seed(0)
+        np.random.seed(0)
+        targets, uav_message, _ = scenario_message(name)
+        ga = GA_SEAD(targets, 300)
+        ga.information_setting(uav_message, None)
+        population = ga.generate_population()
+        population = np.concatenate([population, ga.mutation_operator(np.full(len(population), 1 / len(population)),
+                                                                       population)])
+        half = len(population) // 2
+        parents = ga.population_state(population[:half])
+        touched = np.random.random((half, len(ga.uav_id))) < 0.5
+        result = {}
+        for backend in [False, True]:
+            ga.compiled_kernels = backend
+            bundle = ga.order2bundle(population)
+            result[backend] = [ga.population_state(population), bundle, ga.bundle2order(bundle),
+                               ga.population_state(population[half:2 * half], touched, parents)]
+        for check, numpy_result, numba_result in zip(['state', 'order2bundle', 'bundle2order', 'delta state'],
+                                                     result[False], result[True]):
+            error = np.max(np.abs(numpy_result - numba_result) / np.maximum(1, np.abs(numpy_result)))
+            failed |= error > 1e-9
+            print(f'{len(targets)} targets {check}: max relative error {error:.3e}')
+    sys.exit('kernel parity failed' if failed else 0)
@@ -0,0 +1,85 @@
+class ConvergenceMonitor(object):
+    '''
+    stagnation of the planning loop, the GA backs off while it has converged and no mission update is pending
+        converged : the best fitness improved less than tolerance (relative) over the last patience calls and the
+                    population diversity is at most max_diversity
+        back-off : the idle time after each call doubles from min_idle up to max_idle while converged
+    '''
+    def __init__(self, patience=3, tolerance=1e-3, max_diversity=0.5, min_idle=0.25, max_idle=4.0):
+        self.patience = patience
+        self.tolerance = tolerance
+        self.max_diversity = max_diversity
+        self.min_idle = min_idle
+        self.max_idle = max_idle
+        self.history = []
+        self.idle = 0
+
+    def reset(self):
+        '''
+        new information arrived, spend the full budget again
+        '''
+        self.history = []
+        self.idle = 0
+
+    def converged(self, diversity):
+        if len(self.history) <= self.patience:
+            return False
+        previous = self.history[-1 - self.patience]
+        return self.history[-1] - previous <= self.tolerance * abs(previous) and diversity <= self.max_diversity
+
+    def update(self, best_fitness, diversity, generations=1):
+        '''
+        record the result of a planning call
+            return : idle time before the next call (sec)
+        '''
+        if generations:  # a call spent on the cost graph does not tell anything about the search
+            self.history = self.history[-self.patience:] + [best_fitness]
+        if self.converged(diversity):
+            self.idle = min(self.max_idle, 2 * self.idle) if self.idle else self.min_idle
+        else:
+            self.idle = 0
+        return self.idle
+
+
+if __name__ == "__main__":
+    # back-off of the DPGA planning loop under the routine uav messages of main_process (every 2 s)
+    import sys
+    import copy
+    import time
+    import queue
+    import threading
+    from DPGA import task_allocation_process
+    from benchmark import scenario_message
+    time_interval, period, duration = 0.5, 2.0, 20.0
+    targets, uav_message, pop = scenario_message('13')
+    ga2control_queue, control2ga_queue = queue.Queue(), queue.Queue()
+    control2ga_queue.put(copy.deepcopy(uav_message))
+    planner = threading.Thread(target=task_allocation_process, args=(targets, time_interval, pop, ga2control_queue,
+                                                                      control2ga_queue))
+    start_time = time.time()
+    planner.start()
+    results = []  # time of each planning result
+    next_message = start_time + period
+    while time.time() - start_time < duration:
+        try:
+            ga2control_queue.get(timeout=max(0.01, next_message - time.time()))
+            results.append(time.time() - start_time)
+        except queue.Empty:
+            pass
+        if time.time() >= next_message:  # routine message, nothing but the same positions
+            control2ga_queue.put(copy.deepcopy(uav_message))
+            next_message += period
+    # a finished task changes the problem, it is planned at once
+    changed_message = copy.deepcopy(uav_message)
+    changed_message[8] = [[1, 1]]
+    message_time = time.time() - start_time
+    control2ga_queue.put(changed_message)
+    ga2control_queue.get()
+    latency = time.time() - start_time - message_time
+    control2ga_queue.put([44])
+    planner.join()
+    busy = time_interval * len([t for t in results if t > duration / 2])
+    idle_share = 1 - busy / (duration / 2)
+    print(f'{len(results)} planning calls in {duration:.0f} s, idle share of the last {duration / 2:.0f} s: '
+          f'{idle_share:.0%}, latency of a changed problem: {latency:.2f} s')
+    sys.exit(0 if idle_share > 0.3 and latency < time_interval + 1 else 'the planning loop did not back off')
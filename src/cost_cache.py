@@ -0,0 +1,61 @@
+import os
+import hashlib
+import numpy as np
+
+
+class CostGraphCache(object):
+    '''
+    on-disk cache of the target-to-target cost graphs (.npy), memory-mapped on a warm start
+        key : hash of target coordinates, heading discretization and Rmin
+        eviction : least recently used files are removed once the directory exceeds max_bytes
+    '''
+    def __init__(self, directory, max_bytes=512 * 2 ** 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(targets, headings, rmin, variant=()):
+        '''
+        variant : how the lengths are computed, e.g. the Dubins lookup table, empty for the exact solver
+        '''
+        digest = hashlib.sha1()
+        for value in [targets, headings, [rmin]] + ([variant] if len(variant) else []):
+            digest.update(np.asarray(value, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.npy')
+
+    def load(self, key):
+        try:
+            graph = np.load(self.path(key), mmap_mode='c')  # copy-on-write, the file is never modified
+        except (OSError, ValueError):
+            return None
+        os.utime(self.path(key))  # mark as recently used
+        return graph
+
+    def save(self, key, graph):
+        if graph.nbytes > self.max_bytes:
+            return
+        temp_path = self.path(key) + f'.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            np.save(f, graph)
+        os.replace(temp_path, self.path(key))
+        self.evict()
+
+    def evict(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npy'):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append([stat.st_mtime, stat.st_size, name])
+        total = sum(f[1] for f in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:  # evicted by another process
+                pass
+            total -= size
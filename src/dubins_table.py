@@ -0,0 +1,171 @@
+import os
+import json
+import numpy as np
+from dubins_vectorized import dubins_intermediate, dubins_words
+
+
+def normalized_length(d, alpha, beta):
+    '''
+    exact Dubins shortest length / rho of the normalized geometry
+    '''
+    return np.min(np.sum(dubins_words(d, alpha, beta), axis=1), axis=0)
+
+
+class DubinsLengthTable(object):
+    '''
+    precomputed normalized Dubins shortest length over the relative geometry (d / rho, alpha, beta) of
+    dubins_intermediate, looked up by trilinear interpolation for any target layout and any Rmin
+        axes : u = d / (1 + d) on [0, 1] (every distance, u = 1 is d = inf), alpha and beta periodic on [0, 2 pi)
+        value : excess length L / rho - d, smooth in u up to d = inf
+        rough : cells whose corners differ by more than rough_threshold or whose center is interpolated with a larger
+                error, i.e. cells across a discontinuity of the Dubins length, the lookups inside them are solved
+                exactly (exact=True)
+        error_bound : empirical bound, the largest normalized error of the lookups measured at the cell centers and on
+                      random geometries when the table is built
+                      (lookups in between may exceed it slightly), the error in meters is error_bound * rho
+    '''
+    def __init__(self, table, rough, error_bound, rough_threshold):
+        self.table = table
+        self.rough = rough
+        self.error_bound = error_bound
+        self.rough_threshold = rough_threshold
+        self.shape = table.shape
+
+    @staticmethod
+    def name(shape):
+        return 'dubins_table_' + 'x'.join(str(n) for n in shape)
+
+    def variant(self):
+        '''
+        identity of the table for the keys of cached cost graphs
+        '''
+        return list(self.shape) + [self.rough_threshold]
+
+    @classmethod
+    def build(cls, shape=(256, 144, 144), rough_threshold=0.25, samples=200000, seed=0):
+        u_num, alpha_num, beta_num = shape
+        u = np.linspace(0, 1, u_num)
+        d = u[:-1] / (1 - u[:-1])
+        alpha = np.arange(alpha_num) * 2 * np.pi / alpha_num
+        beta = np.arange(beta_num) * 2 * np.pi / beta_num
+        table = np.zeros(shape, dtype=np.float32)
+        for start in range(0, u_num - 1, 8):  # chunks of the distance axis, the words of 8 rows at a time
+            row = d[start:start + 8, None, None]
+            table[start:start + len(row)] = normalized_length(row, alpha[None, :, None], beta[None, None, :]) - row
+        far = 1e6  # excess length at d = inf
+        table[-1] = normalized_length(far, alpha[:, None], beta[None, :]) - far
+        # spread of the 8 corners of each cell
+        corner = np.stack([table[:-1], table[1:]])
+        corner = np.concatenate([corner, np.roll(corner, -1, axis=2)])
+        corner = np.concatenate([corner, np.roll(corner, -1, axis=3)])
+        rough = np.max(corner, axis=0) - np.min(corner, axis=0) > rough_threshold
+        lookup = cls(table, rough, 0.0, rough_threshold)
+        # thin discontinuities between the corners, the cell centers against the solver
+        center_u = (u[:-1] + u[1:]) / 2
+        center_alpha, center_beta = alpha + np.pi / alpha_num, beta + np.pi / beta_num
+        center_error = np.zeros(rough.shape, dtype=np.float32)
+        for start in range(0, u_num - 1, 8):
+            row = (center_u[start:start + 8] / (1 - center_u[start:start + 8]))[:, None, None]
+            center_error[start:start + len(row)] = np.abs(
+                lookup.normalized_length(row, center_alpha[None, :, None], center_beta[None, None, :], False) -
+                normalized_length(row, center_alpha[None, :, None], center_beta[None, None, :]))
+        rough |= center_error > rough_threshold
+        # error bound on random geometries
+        rng = np.random.default_rng(seed)
+        sample_u = rng.uniform(0, 0.999, samples)
+        sample = sample_u / (1 - sample_u), rng.uniform(0, 2 * np.pi, samples), rng.uniform(0, 2 * np.pi, samples)
+        lookup.error_bound = float(max(np.max(center_error[~rough]),
+                                       np.max(np.abs(lookup.normalized_length(*sample) - normalized_length(*sample)))))
+        return lookup
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.name(self.shape))
+        for suffix, array in [('.npy', self.table), ('_rough.npy', self.rough)]:
+            temp_path = path + suffix + f'.{os.getpid()}.tmp'
+            with open(temp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(temp_path, path + suffix)
+        with open(path + '.json', 'w') as f:
+            json.dump({'error_bound': self.error_bound, 'rough_threshold': self.rough_threshold}, f)
+
+    @classmethod
+    def load(cls, directory=os.path.join(os.path.expanduser('~'), '.cache', 'GA_SEAD', 'dubins_table'),
+             shape=(256, 144, 144), rough_threshold=0.25):
+        '''
+        memory-mapped table of the directory, built and saved once when it is missing
+        '''
+        path = os.path.join(directory, cls.name(shape))
+        try:
+            with open(path + '.json') as f:
+                meta = json.load(f)
+            if meta['rough_threshold'] == rough_threshold:
+                return cls(np.load(path + '.npy', mmap_mode='r'), np.load(path + '_rough.npy', mmap_mode='r'),
+                           meta['error_bound'], rough_threshold)
+        except (OSError, ValueError, KeyError):
+            pass
+        lookup = cls.build(shape, rough_threshold)
+        lookup.save(directory)
+        return lookup
+
+    def normalized_length(self, d, alpha, beta, exact=True):
+        '''
+        interpolated L / rho of the normalized geometry, exact=True: the lookups in rough cells are solved exactly
+        '''
+        d, alpha, beta = np.broadcast_arrays(np.asarray(d, dtype=float), np.asarray(alpha, dtype=float),
+                                             np.asarray(beta, dtype=float))
+        u_num, alpha_num, beta_num = self.shape
+        position = d / (1 + d) * (u_num - 1)
+        i = np.minimum(position.astype(int), u_num - 2)
+        tu = position - i
+        position = alpha * alpha_num / (2 * np.pi)
+        j = np.floor(position).astype(int)
+        ta, j = position - j, j % alpha_num
+        position = beta * beta_num / (2 * np.pi)
+        k = np.floor(position).astype(int)
+        tb, k = position - k, k % beta_num
+        # the 8 corners of the cell gathered from the flat table
+        table = np.asarray(self.table).reshape(-1)
+        corner = (i * alpha_num + j) * beta_num, (i * alpha_num + (j + 1) % alpha_num) * beta_num
+        k_next, row = (k + 1) % beta_num, alpha_num * beta_num
+        value = (1 - tu) * ((1 - ta) * ((1 - tb) * table[corner[0] + k] + tb * table[corner[0] + k_next]) +
+                            ta * ((1 - tb) * table[corner[1] + k] + tb * table[corner[1] + k_next])) + \
+            tu * ((1 - ta) * ((1 - tb) * table[corner[0] + row + k] + tb * table[corner[0] + row + k_next]) +
+                  ta * ((1 - tb) * table[corner[1] + row + k] + tb * table[corner[1] + row + k_next]))
+        length = value + d
+        if exact:
+            rough = self.rough[i, j, k]
+            if np.any(rough):
+                length[rough] = normalized_length(d[rough], alpha[rough], beta[rough])
+        return length
+
+    def length(self, start, end, rho, exact=True):
+        '''
+        table version of dubins_vectorized.dubins_shortest_length
+        '''
+        start, end = np.asarray(start, dtype=float), np.asarray(end, dtype=float)
+        d, alpha, beta = dubins_intermediate(start[..., 0], start[..., 1], start[..., 2],
+                                             end[..., 0], end[..., 1], end[..., 2], rho)
+        return self.normalized_length(d, alpha, beta, exact) * rho
+
+
+if __name__ == "__main__":
+    # accuracy and speed against the exact vectorized solver
+    import time
+    import tempfile
+    from dubins_vectorized import dubins_shortest_length
+    start_time = time.time()
+    lookup = DubinsLengthTable.load(tempfile.mkdtemp())
+    print(f'build: {time.time() - start_time:.1f} s, rough cells: {np.mean(lookup.rough):.2%}, '
+          f'error bound: {lookup.error_bound:.2e} rho')
+    rng = np.random.default_rng(1)
+    q0 = np.column_stack([rng.uniform(0, 5000, (200000, 2)), rng.uniform(-np.pi, np.pi, 200000)])
+    q1 = np.column_stack([rng.uniform(0, 5000, (200000, 2)), rng.uniform(-np.pi, np.pi, 200000)])
+    for exact in [True, False]:
+        start_time = time.time()
+        approximate = lookup.length(q0, q1, 200, exact)
+        lookup_time = time.time() - start_time
+        start_time = time.time()
+        reference = dubins_shortest_length(q0, q1, 200)
+        print(f'exact fallback {exact}: lookup {lookup_time:.3f} s, solver {time.time() - start_time:.3f} s, '
+              f'max error {np.max(np.abs(approximate - reference)):.3f} m')
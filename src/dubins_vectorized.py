@@ -0,0 +1,152 @@
+import numpy as np
+
+
+def mod2pi(theta):
+    theta = theta - 2 * np.pi * np.floor(theta / (2 * np.pi))
+    return np.where(theta > 2 * np.pi - 1e-9, 0, theta)  # -0 rounded below zero is 0, not a full turn
+
+
+def dubins_intermediate(x0, y0, theta0, x1, y1, theta1, rho):
+    '''
+    normalized geometry of the Dubins problem (same convention as dubins.c)
+        d : distance / rho
+        alpha, beta : start and end heading relative to the chord
+    '''
+    dx, dy = np.subtract(x1, x0), np.subtract(y1, y0)
+    d = np.hypot(dx, dy) / rho
+    theta = np.where(d > 0, mod2pi(np.arctan2(dy, dx)), 0)
+    alpha = mod2pi(theta0 - theta)
+    beta = mod2pi(theta1 - theta)
+    return d, alpha, beta
+
+
+def dubins_words(d, alpha, beta):
+    '''
+    segment parameters (t, p, q) of the six Dubins words [LSL, LSR, RSL, RSR, RLR, LRL]
+    infeasible words are filled with inf, output shape: (6, 3) + broadcast shape
+    '''
+    d, alpha, beta = np.broadcast_arrays(np.asarray(d, dtype=float), np.asarray(alpha, dtype=float),
+                                         np.asarray(beta, dtype=float))
+    sa, sb, ca, cb = np.sin(alpha), np.sin(beta), np.cos(alpha), np.cos(beta)
+    c_ab, d_sq = np.cos(alpha - beta), d * d
+    words = np.full((6, 3) + d.shape, np.inf)
+    with np.errstate(invalid='ignore'):
+        # LSL
+        p_sq = 2 + d_sq - 2 * c_ab + 2 * d * (sa - sb)
+        tmp = np.arctan2(cb - ca, d + sa - sb)
+        ok = p_sq >= 0
+        words[0] = np.where(ok, [mod2pi(tmp - alpha), np.sqrt(p_sq), mod2pi(beta - tmp)], np.inf)
+        # LSR
+        p_sq = -2 + d_sq + 2 * c_ab + 2 * d * (sa + sb)
+        p = np.sqrt(p_sq)
+        tmp = np.arctan2(-ca - cb, d + sa + sb) - np.arctan2(-2.0, p)
+        ok = p_sq >= 0
+        words[1] = np.where(ok, [mod2pi(tmp - alpha), p, mod2pi(tmp - beta)], np.inf)
+        # RSL
+        p_sq = -2 + d_sq + 2 * c_ab - 2 * d * (sa + sb)
+        p = np.sqrt(p_sq)
+        tmp = np.arctan2(ca + cb, d - sa - sb) - np.arctan2(2.0, p)
+        ok = p_sq >= 0
+        words[2] = np.where(ok, [mod2pi(alpha - tmp), p, mod2pi(beta - tmp)], np.inf)
+        # RSR
+        p_sq = 2 + d_sq - 2 * c_ab + 2 * d * (sb - sa)
+        tmp = np.arctan2(ca - cb, d - sa + sb)
+        ok = p_sq >= 0
+        words[3] = np.where(ok, [mod2pi(alpha - tmp), np.sqrt(p_sq), mod2pi(tmp - beta)], np.inf)
+        # RLR
+        tmp = (6. - d_sq + 2 * c_ab + 2 * d * (sa - sb)) / 8.
+        phi = np.arctan2(ca - cb, d - sa + sb)
+        p = mod2pi(2 * np.pi - np.arccos(tmp))
+        t = mod2pi(alpha - phi + mod2pi(p / 2.))
+        ok = np.abs(tmp) <= 1
+        words[4] = np.where(ok, [t, p, mod2pi(alpha - beta - t + mod2pi(p))], np.inf)
+        # LRL
+        tmp = (6. - d_sq + 2 * c_ab + 2 * d * (sb - sa)) / 8.
+        phi = np.arctan2(ca - cb, d + sa - sb)
+        p = mod2pi(2 * np.pi - np.arccos(tmp))
+        t = mod2pi(-alpha - phi + p / 2.)
+        ok = np.abs(tmp) <= 1
+        words[5] = np.where(ok, [t, p, mod2pi(beta - alpha - t + mod2pi(p))], np.inf)
+    return words
+
+
+def dubins_shortest_length(start, end, rho):
+    '''
+    vectorized version of dubins.shortest_path(start, end, rho).path_length()
+        start, end : array_like (..., 3) of (x, y, heading), broadcast against each other and rho
+    '''
+    start, end = np.asarray(start, dtype=float), np.asarray(end, dtype=float)
+    d, alpha, beta = dubins_intermediate(start[..., 0], start[..., 1], start[..., 2],
+                                         end[..., 0], end[..., 1], end[..., 2], rho)
+    return np.min(np.sum(dubins_words(d, alpha, beta), axis=1), axis=0) * rho
+
+
+# turn direction of the three segments of each word, 1: left, -1: right, 0: straight
+word_directions = np.array([[1, 0, 1], [1, 0, -1], [-1, 0, 1], [-1, 0, -1], [-1, 1, -1], [1, -1, 1]])
+
+
+def arc_step(rho, tolerance):
+    '''
+    longest chord of a turn of radius rho that stays within tolerance (m) of the arc
+    '''
+    return 2 * rho * np.arccos(np.maximum(-1, 1 - tolerance / rho))
+
+
+def dubins_sample(start, end, rho, tolerance=1.0):
+    '''
+    polyline of the shortest paths of consecutive legs start[i] -> end[i] (end[i] is start[i + 1] for a route)
+    turns are sampled with chords within tolerance (m) of the arc, straight segments are kept as their end points
+        start, end : (leg, 3) of (x, y, heading)
+        return : points (point, 3) of (x, y, heading) from start[0] to end[-1], length of each leg
+    '''
+    start, end = np.atleast_2d(np.asarray(start, dtype=float)), np.atleast_2d(np.asarray(end, dtype=float))
+    rho = np.broadcast_to(np.asarray(rho, dtype=float), start.shape[:1])
+    d, alpha, beta = dubins_intermediate(start[:, 0], start[:, 1], start[:, 2], end[:, 0], end[:, 1], end[:, 2], rho)
+    words = dubins_words(d, alpha, beta)
+    word = np.argmin(np.sum(words, axis=1), axis=0)
+    leg = np.arange(len(start))
+    segment = words[word, :, leg] * rho[:, None]  # (leg, 3) in meters
+    direction = word_directions[word]
+    # configuration at the start of each segment
+    origin = np.empty(segment.shape + (3,))
+    origin[:, 0] = start
+    for k in range(2):
+        origin[:, k + 1] = advance(origin[:, k], direction[:, k], segment[:, k], rho)
+    # samples per segment: none for empty segments, the start point for straight ones, chords within tolerance on turns
+    count = np.where(direction != 0, np.ceil(segment / arc_step(rho, tolerance)[:, None]), 1).astype(int)
+    count[segment <= 0] = 0
+    count = count.ravel()
+    index = np.repeat(np.arange(len(count)), count)
+    offset = np.arange(len(index)) - np.repeat(np.cumsum(count) - count, count)
+    distance = offset / np.repeat(count, count) * segment.ravel()[index]
+    points = advance(origin.reshape(-1, 3)[index], direction.ravel()[index], distance, np.repeat(rho, 3)[index])
+    return np.concatenate([points, end[-1:]]), np.sum(segment, axis=1)
+
+
+def advance(configuration, direction, distance, rho):
+    '''
+    configuration after flying distance along a segment (direction 1: left turn, -1: right turn, 0: straight)
+    '''
+    x, y, theta = configuration[..., 0], configuration[..., 1], configuration[..., 2]
+    turn = direction * distance / rho
+    heading = theta + turn
+    straight = direction == 0
+    # a turn of radius rho around the center at rho to the left (right) of the heading
+    side = np.where(straight, 1, direction) * rho
+    x_next = np.where(straight, x + distance * np.cos(theta), x + side * (np.sin(heading) - np.sin(theta)))
+    y_next = np.where(straight, y + distance * np.sin(theta), y - side * (np.cos(heading) - np.cos(theta)))
+    return np.stack([x_next, y_next, heading], axis=-1)
+
+
+if __name__ == "__main__":
+    # consistency check against the dubins package
+    import dubins
+    rng = np.random.default_rng(0)
+    q0 = np.column_stack([rng.uniform(-3000, 3000, (2000, 2)), rng.uniform(-np.pi, np.pi, 2000)])
+    q1 = np.column_stack([rng.uniform(-3000, 3000, (2000, 2)), rng.uniform(-np.pi, np.pi, 2000)])
+    q1[:200, :2] = q0[:200, :2] + rng.uniform(-300, 300, (200, 2))  # close configurations
+    q1[200:250] = q0[200:250] + [0, 0, 1e-5]  # colocated configurations
+    radius = rng.uniform(50, 300, 2000)
+    vectorized = dubins_shortest_length(q0, q1, radius)
+    reference = np.array([dubins.shortest_path(a, b, r).path_length() for a, b, r in zip(q0, q1, radius)])
+    print(f'max absolute error: {np.max(np.abs(vectorized - reference))} (m)')
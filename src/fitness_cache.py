@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+
+class FitnessCache(object):
+    '''
+    bounded LRU cache from chromosome bytes to its evaluated state
+        state : [fitness, mission time, total distance, penalty, cost of each uav..., arrival time of each gene...]
+        token : state the entries depend on (cost graph version, tasks status), entries are dropped when it changes
+        delta : lookups answered by an entry of the delta evaluation for the first time, evaluations rather than hits
+    '''
+    def __init__(self, max_size=20000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.delta_keys = set()  # entries put by the delta evaluation and not read yet
+        self.token = None
+        self.hits, self.misses, self.delta, self.invalidations = 0, 0, 0, 0
+
+    def validate(self, token):
+        if token != self.token:
+            if self.entries:
+                self.invalidations += 1
+            self.entries.clear()
+            self.delta_keys.clear()
+            self.token = token
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def delta_hit(self, key):
+        '''
+        the entry of key was put by the delta evaluation and is read for the first time
+        '''
+        if key in self.delta_keys:
+            self.delta_keys.discard(key)
+            return True
+        return False
+
+    def put(self, key, value, delta=False):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if delta:
+            self.delta_keys.add(key)
+        else:
+            self.delta_keys.discard(key)
+        while len(self.entries) > self.max_size:
+            self.delta_keys.discard(self.entries.popitem(last=False)[0])
+
+    def record(self, hits, misses, delta=0):
+        self.hits += hits
+        self.misses += misses
+        self.delta += delta
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses + self.delta
+        return self.hits / lookups if lookups else 0
+
+    def stats(self):
+        return {'size': len(self.entries), 'hits': self.hits, 'misses': self.misses, 'delta': self.delta,
+                'hit_rate': self.hit_rate(), 'invalidations': self.invalidations}
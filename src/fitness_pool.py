@@ -0,0 +1,106 @@
+import os
+import traceback
+import numpy as np
+import multiprocessing as mp
+from GA_SEAD_process import GA_SEAD
+from shared_cost import SharedCostTensor, ensure_tracker, export_cost_tensor, attach, close_blocks
+
+
+def fitness_worker(worker, task_queue, result_queue):
+    '''
+    evaluate a range of the shared population buffer into the shared state buffer
+    '''
+    tensor, buffer, sead_mission, current_model = None, None, None, None
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        model, tensor_descriptor, buffer_descriptor, shape, start, stop = task
+        try:
+            if model is not None or tensor is None or tensor.descriptor != tensor_descriptor:
+                current_model, sead_mission = model or current_model, None  # release the views into the old block
+            tensor = attach(tensor, tensor_descriptor)
+            if sead_mission is None:
+                sead_mission = GA_SEAD.from_model(current_model, tensor.arrays)
+            buffer = attach(buffer, buffer_descriptor, writeable=True)
+            chromosome_num, gene_num, state_len = shape
+            population = buffer.arrays['population'][:chromosome_num * 5 * gene_num].reshape((-1, 5, gene_num))
+            state = buffer.arrays['state'][:chromosome_num * state_len].reshape((-1, state_len))
+            state[start:stop] = sead_mission.population_state(population[start:stop])
+            result_queue.put((worker, None))
+        except Exception:
+            result_queue.put((worker, traceback.format_exc()))
+    sead_mission = None
+    close_blocks(tensor, buffer)
+
+
+class FitnessPool(object):
+    '''
+    persistent worker processes sharing the evaluation of one population
+        cost tensor : shared read-only, exported again only when cost_version changes
+        population / state buffer : shared, only index ranges cross the process boundary
+        min_batch : smaller batches are evaluated in the calling process, by default two chromosomes per worker so the
+                    pool takes the generations of the onboard populations (population_size ~ pop / uav number), each
+                    dispatch costs a few ms of interprocess round trip, so tune it on the target hardware
+    '''
+    def __init__(self, worker_num=os.cpu_count(), min_batch=None):
+        self.worker_num = worker_num
+        self.min_batch = min_batch or 2 * worker_num
+        ensure_tracker()
+        self.task_queues = [mp.Queue() for _ in range(worker_num)]
+        self.result_queue = mp.Queue()
+        self.workers = [mp.Process(target=fitness_worker, args=(k, self.task_queues[k], self.result_queue),
+                                   daemon=True) for k in range(worker_num)]
+        for worker in self.workers:
+            worker.start()
+        self.tensor, self.tensor_version = None, None
+        self.buffer = None
+        self.model_version = [None for _ in range(worker_num)]  # cost_version of the model each worker holds
+
+    def share_cost_tensor(self, sead_mission):
+        self.tensor, self.tensor_version = export_cost_tensor(sead_mission, self.tensor, self.tensor_version)
+        return self.tensor.descriptor
+
+    def share_population(self, population, state_len):
+        gene_size, state_size = population.size, len(population) * state_len
+        if self.buffer is None or self.buffer.arrays['population'].size < gene_size or \
+                self.buffer.arrays['state'].size < state_size:
+            if self.buffer:
+                self.buffer.close()
+            self.buffer = SharedCostTensor({'population': np.zeros(2 * gene_size, dtype=population.dtype),
+                                            'state': np.zeros(2 * state_size)})
+        self.buffer.arrays['population'][:gene_size] = population.ravel()
+        return self.buffer.descriptor
+
+    def population_state(self, sead_mission, population):
+        '''
+        GA_SEAD.population_state of the population, split over the workers
+        '''
+        population = sead_mission.as_population(population)
+        shape = (len(population), population.shape[2], 4 + len(sead_mission.uav_id) + population.shape[2])
+        tensor_descriptor = self.share_cost_tensor(sead_mission)
+        buffer_descriptor = self.share_population(population, shape[2])
+        stale = [version != sead_mission.cost_version for version in self.model_version]
+        model = sead_mission.evaluation_model() if any(stale) else None
+        bounds = np.linspace(0, len(population), self.worker_num + 1).astype(int)
+        for k in range(self.worker_num):
+            self.task_queues[k].put((model if stale[k] else None, tensor_descriptor, buffer_descriptor, shape,
+                                     bounds[k], bounds[k + 1]))
+            self.model_version[k] = sead_mission.cost_version
+        errors = []
+        for _ in range(self.worker_num):
+            worker, error = self.result_queue.get()
+            if error:
+                self.model_version[worker] = None
+                errors.append(f'fitness worker {worker} failed:\n{error}')
+        if errors:
+            raise RuntimeError('\n'.join(errors))
+        return self.buffer.arrays['state'][:shape[0] * shape[2]].reshape((-1, shape[2])).copy()
+
+    def close(self):
+        for task_queue in self.task_queues:
+            task_queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        close_blocks(self.tensor, self.buffer)
+        self.tensor = self.buffer = None
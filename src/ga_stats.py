@@ -0,0 +1,54 @@
+import time
+
+
+class GAStats(object):
+    '''
+    profile of one run_GA_time_period_version call
+        time : seconds spent in each stage, graph (cost graph updates) also counts in setting (information_setting)
+               except for the heading refinement, mutation includes the delta evaluation of the
+               mutants (delta_evaluation)
+        best_fitness : best fitness of the population after each generation
+        cache : fitness cache hits / misses / delta evaluations during the call
+    '''
+    stages = ['setting', 'graph', 'elitism', 'memetic', 'crossover', 'mutation', 'fitness']
+
+    def __init__(self, fitness_cache=None):
+        self.start = time.perf_counter()
+        self.elapsed = 0
+        self.generations = 0
+        self.time = dict.fromkeys(self.stages, 0.0)
+        self.best_fitness = []
+        self.fitness_cache = fitness_cache
+        self.cache_base = (fitness_cache.hits, fitness_cache.misses, fitness_cache.delta) if fitness_cache else \
+            (0, 0, 0)
+        self.cache_hits, self.cache_misses, self.cache_delta = 0, 0, 0
+
+    def add(self, stage, start):
+        '''
+        add the time since start (time.perf_counter()) to the stage, return the current time for the next stage
+        '''
+        now = time.perf_counter()
+        self.time[stage] += now - start
+        return now
+
+    def generation(self, best_fitness, generations=1):
+        self.generations += generations
+        self.best_fitness.append(best_fitness)
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.start
+        if self.fitness_cache:
+            self.cache_hits = self.fitness_cache.hits - self.cache_base[0]
+            self.cache_misses = self.fitness_cache.misses - self.cache_base[1]
+            self.cache_delta = self.fitness_cache.delta - self.cache_base[2]
+        return self
+
+    def cache_hit_rate(self):
+        lookups = self.cache_hits + self.cache_misses + self.cache_delta
+        return self.cache_hits / lookups if lookups else 0
+
+    def as_dict(self):
+        return {'elapsed': self.elapsed, 'generations': self.generations, 'time': dict(self.time),
+                'best_fitness': list(self.best_fitness), 'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses, 'cache_delta': self.cache_delta,
+                'cache_hit_rate': self.cache_hit_rate()}
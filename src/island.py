@@ -0,0 +1,146 @@
+import os
+import time
+import random
+import queue
+import traceback
+import numpy as np
+import multiprocessing as mp
+from GA_SEAD_process import GA_SEAD
+from fitness_cache import FitnessCache
+from shared_cost import ensure_tracker, export_cost_tensor, attach, close_blocks
+
+
+def island_worker(island, island_num, task_queue, result_queue, migration_queues, topology, migration_interval,
+                  migration_num):
+    '''
+    evolve the sub-population of each task until its deadline, the cost tensor stays attached between tasks
+    '''
+    result_queue.put((None, island))  # ready, the start of the process does not count against the first deadline
+    np.random.seed((os.getpid() * 7919 + island) % 2 ** 32)
+    random.seed(os.getpid() * 7919 + island)
+    tensor, sead_mission, fitness_cache = None, None, FitnessCache()
+    if topology == 'ring':
+        destination = [(island + 1) % island_num]
+    else:  # broadcast
+        destination = [k for k in range(island_num) if k != island]
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        epoch, model, descriptor, population, population_size, deadline = task
+        try:
+            sead_mission = None  # release the views into the old block
+            tensor = attach(tensor, descriptor)
+            sead_mission = GA_SEAD.from_model(model, tensor.arrays)
+            sead_mission.fitness_cache = fitness_cache
+            sead_mission.set_population_size(population_size)
+            if not len(population):
+                population = sead_mission.generate_population()
+            fitness, wheel = sead_mission.fitness_evaluate(population)
+            generation = 0
+            while time.time() < deadline:
+                generation += 1
+                population = sead_mission.next_generation(fitness, wheel, population)
+                fitness, wheel = sead_mission.fitness_evaluate(population)
+                if generation % migration_interval == 0:
+                    elites = sead_mission.elitism_operator(fitness, population)[:migration_num]
+                    for k in destination:
+                        migration_queues[k].put((epoch, elites))
+                    immigrated = False
+                    while True:  # immigrants replace the mutated children at the end of the population
+                        try:
+                            migrant_epoch, migrants = migration_queues[island].get_nowait()
+                        except queue.Empty:
+                            break
+                        if migrant_epoch == epoch and migrants.shape[1:] == population.shape[1:]:
+                            population[-len(migrants):] = migrants[:len(population)]
+                            immigrated = True
+                    if immigrated:
+                        fitness, wheel = sead_mission.fitness_evaluate(population)
+            result_queue.put((epoch, island, population, fitness, generation))
+        except Exception:
+            result_queue.put((epoch, island, None, traceback.format_exc(), 0))
+    sead_mission = None
+    close_blocks(tensor)
+
+
+class IslandModel(object):
+    '''
+    island-model GA, K persistent worker processes each evolve a sub-population (population_size / K) against the
+    cost tensor shared read-only through multiprocessing.shared_memory, and elites migrate every migration_interval
+    generations
+        topology : 'ring' (to the next island) or 'broadcast' (to every other island)
+        timeout : time the islands may take after the deadline before evolve gives up (sec)
+    '''
+    def __init__(self, island_num=os.cpu_count(), topology='ring', migration_interval=10, migration_num=2,
+                 timeout=10):
+        if topology not in ['ring', 'broadcast']:
+            raise ValueError(f'unknown migration topology: {topology}')
+        self.island_num = island_num
+        self.timeout = timeout
+        ensure_tracker()
+        self.task_queues = [mp.Queue() for _ in range(island_num)]
+        self.migration_queues = [mp.Queue() for _ in range(island_num)]
+        self.result_queue = mp.Queue()
+        self.workers = [mp.Process(target=island_worker, daemon=True,
+                                   args=(k, island_num, self.task_queues[k], self.result_queue,
+                                         self.migration_queues, topology, migration_interval, migration_num))
+                        for k in range(island_num)]
+        for worker in self.workers:
+            worker.start()
+        for _ in range(island_num):
+            try:
+                self.result_queue.get(timeout=60)
+            except queue.Empty:
+                self.close()
+                raise RuntimeError('island workers did not start')
+        self.tensor, self.tensor_version = None, None
+        self.epoch = 0
+        self.generations = [0 for _ in range(island_num)]  # generations of each island in the last evolve
+
+    def share_cost_tensor(self, sead_mission):
+        self.tensor, self.tensor_version = export_cost_tensor(sead_mission, self.tensor, self.tensor_version)
+        return self.tensor.descriptor
+
+    def evolve(self, sead_mission, population, deadline):
+        '''
+        split the population over the islands and evolve them until the deadline (time.time())
+            return : merged population of population_size and its fitness
+        '''
+        descriptor = self.share_cost_tensor(sead_mission)
+        model = sead_mission.evaluation_model()
+        self.epoch += 1
+        sizes = [len(part) for part in np.array_split(np.arange(sead_mission.population_size), self.island_num)]
+        for k, sub_population in enumerate(np.array_split(population, self.island_num)):
+            self.task_queues[k].put((self.epoch, model, descriptor, sub_population, sizes[k], deadline))
+        results = []
+        while len(results) < self.island_num:
+            try:
+                result = self.result_queue.get(timeout=1)
+            except queue.Empty:
+                dead = [k for k, worker in enumerate(self.workers) if not worker.is_alive()]
+                if dead:
+                    raise RuntimeError(f'island workers {dead} exited')
+                if time.time() > deadline + self.timeout:
+                    raise RuntimeError(f'islands did not return {self.timeout} s after the deadline')
+                continue
+            if result[0] == self.epoch:  # results of an evolve given up before are dropped
+                results.append(result[1:])
+        results.sort(key=lambda result: result[0])
+        for island, sub_population, fitness, generation in results:
+            if sub_population is None:
+                raise RuntimeError(f'island {island} failed:\n{fitness}')
+            self.generations[island] = generation
+        population = np.concatenate([result[1] for result in results])
+        fitness = np.concatenate([result[2] for result in results])
+        # islands smaller than the elites and two children are padded, keep the best population_size
+        best = np.sort(np.argsort(-fitness, kind='stable')[:sead_mission.population_size])
+        return population[best], fitness[best].tolist()
+
+    def close(self):
+        for task_queue in self.task_queues:
+            task_queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        close_blocks(self.tensor)
+        self.tensor = None
@@ -0,0 +1,43 @@
+import numpy as np
+
+
+def roulette_selection(wheel, num):
+    '''
+    fitness proportional selection with replacement
+        wheel : selection probability of each chromosome (fitness / sum of fitness)
+    '''
+    return np.random.choice(len(wheel), size=num, p=wheel)
+
+
+def stochastic_universal_sampling(wheel, num):
+    '''
+    fitness proportional selection with num evenly spaced pointers on one spin, lowest variance of the copies
+    '''
+    pointer = (np.random.random() + np.arange(num)) / num
+    chosen = np.minimum(np.searchsorted(np.cumsum(wheel), pointer, side='right'), len(wheel) - 1)
+    return np.random.permutation(chosen)
+
+
+def tournament_selection(wheel, num, size=2):
+    '''
+    the best of size chromosomes drawn uniformly, for each of the num parents
+    '''
+    contestant = np.random.randint(0, len(wheel), (num, size))
+    return contestant[np.arange(num), np.argmax(np.asarray(wheel)[contestant], axis=1)]
+
+
+def rank_selection(wheel, num, pressure=1.5):
+    '''
+    linear ranking, the best chromosome is drawn pressure times as often as the average one (1 < pressure <= 2)
+    '''
+    chromosome_num = len(wheel)
+    if chromosome_num == 1:
+        return np.zeros(num, dtype=int)
+    rank = np.empty(chromosome_num)
+    rank[np.argsort(wheel, kind='stable')] = np.arange(chromosome_num)
+    probability = (2 - pressure) / chromosome_num + 2 * rank * (pressure - 1) / (chromosome_num * (chromosome_num - 1))
+    return np.random.choice(chromosome_num, size=num, p=probability / np.sum(probability))
+
+
+selection_methods = {'roulette': roulette_selection, 'sus': stochastic_universal_sampling,
+                     'tournament': tournament_selection, 'rank': rank_selection}
@@ -0,0 +1,82 @@
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+
+class SharedCostTensor(object):
+    '''
+    named arrays (cost graphs, departure / arrival cost, population buffers) packed in one shared memory block,
+    worker processes attach to the block through its descriptor instead of receiving pickled copies
+        descriptor : (block name, [(key, offset, shape, dtype), ...])
+        owner : the creating process, it unlinks the block on close
+    '''
+    alignment = 64
+
+    def __init__(self, arrays=None, descriptor=None, writeable=False):
+        self.owner = descriptor is None
+        if self.owner:
+            layout, offset = [], 0
+            for key, array in arrays.items():
+                layout.append((key, offset, array.shape, array.dtype.str))
+                offset += -(-array.nbytes // self.alignment) * self.alignment
+            self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+            descriptor = (self.shm.name, layout)
+        else:
+            self.shm = shared_memory.SharedMemory(name=descriptor[0])
+        self.descriptor = descriptor
+        self.arrays = {}
+        for key, offset, shape, dtype in descriptor[1]:
+            array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+            if self.owner:
+                array[...] = arrays[key]
+            else:
+                array.flags.writeable = writeable  # read only in the workers by default
+            self.arrays[key] = array
+
+    @classmethod
+    def attach(cls, descriptor, writeable=False):
+        return cls(descriptor=descriptor, writeable=writeable)
+
+    def close(self):
+        self.arrays = {}  # release the views before the buffer
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def ensure_tracker():
+    '''
+    start the resource tracker in the owner process before its workers, so they share it and never unlink the blocks
+    when they exit
+    '''
+    resource_tracker.ensure_running()
+
+
+def export_cost_tensor(sead_mission, tensor=None, version=None):
+    '''
+    cost tensor of the mission in shared memory, exported again only when the cost_version changed
+        return : tensor, cost_version of the tensor
+    '''
+    if tensor is None or version != sead_mission.cost_version:
+        new_tensor = SharedCostTensor(sead_mission.cost_tensor())
+        if tensor:
+            tensor.close()  # the workers keep their mapping until they attach to the new block
+        tensor, version = new_tensor, sead_mission.cost_version
+    return tensor, version
+
+
+def attach(block, descriptor, writeable=False):
+    '''
+    block of the descriptor in a worker, the previous block is closed when the descriptor changed (the views into it
+    must be released first)
+    '''
+    if block is None or block.descriptor != descriptor:
+        if block:
+            block.close()
+        block = SharedCostTensor.attach(descriptor, writeable)
+    return block
+
+
+def close_blocks(*blocks):
+    for block in blocks:
+        if block:
+            block.close()